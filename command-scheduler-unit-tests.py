@@ -0,0 +1,149 @@
+# External modules.
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Internal modules.
+from command_scheduler import CommandScheduler
+from hal_telemetry import TelemetryPoller
+
+
+# Class to test command arbitration on one port.
+class test_command_scheduler(unittest.TestCase):
+
+    def setUp(self):
+        # Mock controller that records the order commands reach the port.
+        self.order = []
+        self.controller = MagicMock()
+        self.controller.estop.side_effect = lambda: self.order.append("estop")
+        self.scheduler = CommandScheduler(self.controller)
+        self.release = threading.Event()
+        self.threads = []
+
+    def tearDown(self):
+        self.release.set()
+        for thread in self.threads:
+            thread.join(1)
+
+    def inBackground(self, target) -> None:
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def holdBus(self) -> None:
+        """Starts a slow transaction that keeps the bus until released"""
+        started = threading.Event()
+
+        def slowRead(device):
+            started.set()
+            self.release.wait()
+            self.order.append("slow")
+
+        self.inBackground(lambda: self.scheduler.call(slowRead))
+        self.assertTrue(started.wait(1))
+
+    def waitUntil(self, condition) -> None:
+        deadline = time.monotonic() + 2
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.005)
+
+    def test_call(self):
+        """Checks calls run on the device and return its result"""
+        self.controller.readBatteryVoltage.return_value = 24
+        self.assertEqual(
+            self.scheduler.call(lambda device: device.readBatteryVoltage()), 24
+        )
+        self.assertFalse(self.scheduler.busy)
+
+    def test_priorityLane(self):
+        """Checks an estop jumps ahead of queued telemetry"""
+        self.holdBus()
+        for index in range(3):
+            self.inBackground(
+                lambda index=index: self.scheduler.call(
+                    lambda device: self.order.append(f"read{index}")
+                )
+            )
+        self.inBackground(self.scheduler.estop)
+        self.waitUntil(lambda: self.scheduler._priority_waiting == 1)
+        self.release.set()
+        self.waitUntil(lambda: len(self.order) == 5)
+        self.assertEqual(self.order[:2], ["slow", "estop"])
+        self.assertGreater(self.scheduler.last_priority_wait, 0)
+        self.assertEqual(
+            self.scheduler.max_priority_wait, self.scheduler.last_priority_wait
+        )
+
+    def test_mobileBase(self):
+        """Checks estop uses eStop on a mobile base"""
+        base = MagicMock(spec=["eStop", "stop"])
+        scheduler = CommandScheduler(base)
+        scheduler.estop()
+        scheduler.stop()
+        base.eStop.assert_called_once()
+        base.stop.assert_called_once()
+
+    def test_coalescing(self):
+        """Checks telemetry queued under one key is read once"""
+        self.controller.readBatteryVoltage.return_value = 24
+        self.holdBus()
+        results = []
+        for _ in range(3):
+            self.inBackground(
+                lambda: results.append(
+                    self.scheduler.query(
+                        "battery_voltage", lambda device: device.readBatteryVoltage()
+                    )
+                )
+            )
+        self.waitUntil(lambda: "battery_voltage" in self.scheduler._pending)
+        time.sleep(0.05)
+        self.release.set()
+        self.waitUntil(lambda: len(results) == 3)
+        self.assertEqual(results, [24, 24, 24])
+        self.assertEqual(self.controller.readBatteryVoltage.call_count, 1)
+        # A later query gets a fresh reading.
+        self.scheduler.query(
+            "battery_voltage", lambda device: device.readBatteryVoltage()
+        )
+        self.assertEqual(self.controller.readBatteryVoltage.call_count, 2)
+
+    def test_queryError(self):
+        """Checks a failed read reaches the caller and frees the bus"""
+        error = IOError("port closed")
+
+        def failingRead(device):
+            raise error
+
+        with self.assertRaises(IOError):
+            self.scheduler.query("battery_voltage", failingRead)
+        self.assertFalse(self.scheduler.busy)
+        self.assertEqual(self.scheduler._pending, {})
+
+    def test_poller(self):
+        """Checks an estop waits for one poller query, not a whole cycle"""
+        started = threading.Event()
+
+        def slowQuery(device):
+            started.set()
+            self.release.wait()
+            self.order.append("query")
+
+        poller = TelemetryPoller(
+            self.controller,
+            {"first": slowQuery, "second": slowQuery},
+            lock=self.scheduler.lock,
+        )
+        self.inBackground(poller.pollOnce)
+        self.assertTrue(started.wait(1))
+        self.inBackground(self.scheduler.estop)
+        self.waitUntil(lambda: self.scheduler._priority_waiting == 1)
+        self.release.set()
+        self.waitUntil(lambda: len(self.order) == 3)
+        self.assertEqual(self.order, ["query", "estop", "query"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# External modules.
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+
+class BusLock:
+    """Lock-like handle on a CommandScheduler's bus, for code that takes a
+    plain lock such as TelemetryPoller"""
+
+    def __init__(self, scheduler: "CommandScheduler", priority: bool = False):
+        self._scheduler = scheduler
+        self._priority = priority
+
+    def acquire(self) -> bool:
+        self._scheduler._acquire(self._priority)
+        return True
+
+    def release(self) -> None:
+        self._scheduler._release()
+
+    def locked(self) -> bool:
+        return self._scheduler.busy
+
+    def __enter__(self) -> "BusLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class CommandScheduler:
+    """Serializes transactions on one Roboteq or MobileBase, whose drivers
+    do not guard their ports themselves.
+
+    Safety commands (estop, stop, stopMotor) go through a priority lane:
+    they get the bus as soon as the transaction in flight finishes, ahead
+    of anything queued, so their wait is bounded by one transaction. The
+    wait is recorded in last_priority_wait and max_priority_wait.
+    Telemetry queued under the same key is coalesced; callers that arrive
+    before it is sent share one transaction and its result."""
+
+    def __init__(self, device, clock: Callable[[], float] = time.monotonic):
+        self.device = device
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._busy = False
+        self._priority_waiting = 0
+        self._pending: Dict[str, Future] = {}
+        self.last_priority_wait: Optional[float] = None
+        self.max_priority_wait = 0.0
+        # Shared with other users of the port, e.g. TelemetryPoller(lock=...).
+        self.lock = BusLock(self)
+
+    @property
+    def busy(self) -> bool:
+        return self._busy
+
+    def call(self, operation: Callable, priority: bool = False):
+        """Runs operation(device) once it has the bus"""
+        start = self._clock()
+        self._acquire(priority)
+        try:
+            if priority:
+                wait = self._clock() - start
+                self.last_priority_wait = wait
+                self.max_priority_wait = max(self.max_priority_wait, wait)
+            return operation(self.device)
+        finally:
+            self._release()
+
+    def query(self, key: str, operation: Callable):
+        """Runs a telemetry read, joining one already queued under key"""
+        with self._condition:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+        if not owner:
+            return future.result()
+
+        self._acquire(False)
+        try:
+            # Callers arriving from now on need a fresh reading.
+            with self._condition:
+                del self._pending[key]
+            future.set_result(operation(self.device))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            self._release()
+        return future.result()
+
+    def estop(self):
+        # Roboteq calls it estop, MobileBase eStop.
+        name = "estop" if hasattr(self.device, "estop") else "eStop"
+        return self.call(lambda device: getattr(device, name)(), priority=True)
+
+    def stop(self):
+        return self.call(lambda device: device.stop(), priority=True)
+
+    def stopMotor(self, channel: int):
+        return self.call(lambda device: device.stopMotor(channel), priority=True)
+
+    def _acquire(self, priority: bool) -> None:
+        with self._condition:
+            if priority:
+                self._priority_waiting += 1
+            try:
+                while self._busy or (not priority and self._priority_waiting):
+                    self._condition.wait()
+            finally:
+                if priority:
+                    self._priority_waiting -= 1
+            self._busy = True
+
+    def _release(self) -> None:
+        with self._condition:
+            self._busy = False
+            self._condition.notify_all()
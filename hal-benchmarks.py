@@ -0,0 +1,251 @@
+# External modules.
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+# Internal modules.
+from roboteq_simulator import SimulatedRoboteqFactory
+from unloading_robot_hal.mobile_base import MobileBase  # type: ignore
+from unloading_robot_hal.roboteq_driver import Roboteq  # type: ignore
+
+# Upper bucket edges of the latency histograms, in microseconds.
+HISTOGRAM_EDGES_US = [50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000]
+
+# A workload is a timed operation and an untimed cleanup run after it.
+Workload = Tuple[Callable[[], object], Optional[Callable[[], object]]]
+
+
+def roboteq_workloads(controller) -> Dict[str, Workload]:
+    return {
+        "setSpeed": (lambda: controller.setSpeed(500, 1), None),
+        "stop": (controller.stop, None),
+        "estop": (controller.estop, controller.releaseEstop),
+        "readMotorSpeedRPM": (lambda: controller.readMotorSpeedRPM(1), None),
+        "readBatteryVoltage": (controller.readBatteryVoltage, None),
+        "readFaultFlags": (controller.readFaultFlags, None),
+    }
+
+
+def mobile_base_workloads(base) -> Dict[str, Workload]:
+    return {
+        "setSpeed": (lambda: base.setSpeed(500, -500), None),
+        "move": (lambda: base.move(50, 10), None),
+        "stop": (base.stop, None),
+        "eStop": (base.eStop, base.releaseEstop),
+        "readMotorSpeedRatio": (base.readMotorSpeedRatio, None),
+        "readBatteryVoltage": (base.readBatteryVoltage, None),
+        "readFaultFlags": (base.readFaultFlags, None),
+    }
+
+
+# Relative weights of each operation in the mixed workload.
+MIXED_WEIGHTS = {
+    "setSpeed": 10,
+    "move": 10,
+    "readMotorSpeedRPM": 4,
+    "readMotorSpeedRatio": 4,
+    "readBatteryVoltage": 1,
+    "readFaultFlags": 2,
+    "stop": 1,
+    "estop": 1,
+    "eStop": 1,
+}
+
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    """Throughput, percentiles and a histogram for latencies in seconds"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(count - 1, int(fraction * count))] * 1e6
+
+    histogram = [0] * (len(HISTOGRAM_EDGES_US) + 1)
+    for latency in ordered:
+        micros = latency * 1e6
+        bucket = 0
+        while bucket < len(HISTOGRAM_EDGES_US) and micros > HISTOGRAM_EDGES_US[bucket]:
+            bucket += 1
+        histogram[bucket] += 1
+
+    return {
+        "count": count,
+        "ops_per_sec": count / elapsed if elapsed > 0 else 0.0,
+        "mean_us": sum(ordered) / count * 1e6,
+        "p50_us": percentile(0.50),
+        "p90_us": percentile(0.90),
+        "p99_us": percentile(0.99),
+        "max_us": ordered[-1] * 1e6,
+        "histogram_edges_us": HISTOGRAM_EDGES_US,
+        "histogram": histogram,
+    }
+
+
+def run_workload(workload: Workload, iterations: int, warmup: int) -> dict:
+    operation, cleanup = workload
+    for _ in range(warmup):
+        operation()
+        if cleanup is not None:
+            cleanup()
+
+    latencies = []
+    timed = 0.0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        latency = time.perf_counter() - start
+        latencies.append(latency)
+        timed += latency
+        if cleanup is not None:
+            cleanup()
+    return summarize(latencies, timed)
+
+
+def run_mixed(workloads: Dict[str, Workload], iterations: int, seed: int) -> dict:
+    """Random mix of commands and telemetry, reported overall and per command"""
+    names = [name for name in workloads if name in MIXED_WEIGHTS]
+    weights = [MIXED_WEIGHTS[name] for name in names]
+    choices = random.Random(seed).choices(names, weights, k=iterations)
+
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    everything = []
+    timed = 0.0
+    for name in choices:
+        operation, cleanup = workloads[name]
+        start = time.perf_counter()
+        operation()
+        latency = time.perf_counter() - start
+        latencies[name].append(latency)
+        everything.append(latency)
+        timed += latency
+        if cleanup is not None:
+            cleanup()
+
+    result = summarize(everything, timed)
+    result["per_command"] = {
+        name: summarize(values, sum(values))
+        for name, values in latencies.items()
+        if values
+    }
+    return result
+
+
+def build_targets(args) -> Dict[str, Tuple[object, Dict[str, Workload]]]:
+    """Drivers under test, each backed by its own simulated controllers"""
+    options = {
+        "baudrate": args.baudrate,
+        "processing_delay": args.processing_delay,
+        "seed": args.seed,
+    }
+    targets = {}
+    with patch("serial.Serial", side_effect=SimulatedRoboteqFactory(**options)):
+        controller = Roboteq("COM3")
+        targets["roboteq"] = (controller, roboteq_workloads(controller))
+    with patch("serial.Serial", side_effect=SimulatedRoboteqFactory(**options)):
+        base = MobileBase("COM3")
+        targets["mobilebase_one_driver"] = (base, mobile_base_workloads(base))
+    with patch("serial.Serial", side_effect=SimulatedRoboteqFactory(**options)):
+        base = MobileBase("COM3", "COM4")
+        targets["mobilebase_two_drivers"] = (base, mobile_base_workloads(base))
+    return targets
+
+
+def git_commit() -> Optional[str]:
+    try:
+        # Ask the repository the benchmarks live in, wherever they are run from.
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Prints the change in p50/p99 latency against an earlier run"""
+    print(f"\nCompared to {baseline.get('commit') or 'baseline'}:")
+    for target, workloads in results["targets"].items():
+        for name, current in workloads.items():
+            previous = baseline.get("targets", {}).get(target, {}).get(name)
+            if previous is None:
+                continue
+            for key in ("p50_us", "p99_us"):
+                if previous[key] == 0:
+                    print(f"  {target:24} {name:20} {key:7}     n/a")
+                    continue
+                change = (current[key] - previous[key]) / previous[key] * 100
+                print(f"  {target:24} {name:20} {key:7} {change:+7.1f}%")
+
+
+def print_results(results: dict) -> None:
+    for target, workloads in results["targets"].items():
+        print(f"\n{target}")
+        print(
+            f"  {'workload':20} {'ops/s':>9} {'p50 us':>9} {'p90 us':>9}"
+            f" {'p99 us':>9} {'max us':>9}"
+        )
+        for name, result in workloads.items():
+            print(
+                f"  {name:20} {result['ops_per_sec']:9.0f} {result['p50_us']:9.0f}"
+                f" {result['p90_us']:9.0f} {result['p99_us']:9.0f}"
+                f" {result['max_us']:9.0f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Throughput and latency benchmarks for Roboteq and MobileBase "
+        "against simulated controllers."
+    )
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument(
+        "--processing-delay",
+        type=float,
+        default=0.0005,
+        help="controller turnaround time per command in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier run")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "targets": {},
+    }
+    for target, (driver, workloads) in build_targets(args).items():
+        results["targets"][target] = {
+            name: run_workload(workload, args.iterations, args.warmup)
+            for name, workload in workloads.items()
+        }
+        results["targets"][target]["mixed"] = run_mixed(
+            workloads, args.iterations, args.seed
+        )
+        driver.close()
+
+    print_results(results)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# External modules.
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Internal modules.
+from hal_telemetry import MOBILE_BASE_QUERIES, TelemetryPoller
+
+
+# Class to test the background telemetry poller.
+class test_telemetry_poller(unittest.TestCase):
+
+    def setUp(self):
+        # Mock roboteq controller with fixed readings.
+        self.controller = MagicMock()
+        self.controller.readMotorSpeedRPM.side_effect = lambda channel: 100 * channel
+        self.controller.readBatteryVoltage.return_value = 24
+        self.controller._readResponse.return_value = "FF=0\r"
+        self.now = 5.0
+        self.poller = TelemetryPoller(self.controller, clock=lambda: self.now)
+
+    def test_pollOnce(self):
+        """Checks one cycle publishes every query with a timestamp"""
+        self.assertIsNone(self.poller.latest)
+        self.assertEqual(self.poller.get("battery_voltage", 0), 0)
+        snapshot = self.poller.pollOnce()
+        self.assertIs(self.poller.latest, snapshot)
+        self.assertEqual(snapshot.stamp, 5.0)
+        self.assertEqual(
+            dict(snapshot.values),
+            {
+                "motor_rpm_1": 100,
+                "motor_rpm_2": 200,
+                "battery_voltage": 24,
+                "fault_flags": 0,
+            },
+        )
+        self.assertEqual(self.poller.get("motor_rpm_2"), 200)
+        self.now = 5.5
+        self.assertEqual(self.poller.age(), 0.5)
+        # Snapshots are read only.
+        with self.assertRaises(TypeError):
+            snapshot.values["battery_voltage"] = 0
+
+    def test_queryError(self):
+        """Checks a failing query is reported without hiding the others"""
+        error = IOError("port closed")
+        self.controller.readBatteryVoltage.side_effect = error
+        snapshot = self.poller.pollOnce()
+        self.assertNotIn("battery_voltage", snapshot.values)
+        self.assertIs(snapshot.errors["battery_voltage"], error)
+        self.assertEqual(snapshot.values["motor_rpm_1"], 100)
+
+    def test_faultFlags(self):
+        """Checks FF is read without logging and changes are reported once"""
+        on_fault_change = MagicMock()
+        poller = TelemetryPoller(
+            self.controller, clock=lambda: self.now, on_fault_change=on_fault_change
+        )
+        poller.pollOnce()
+        self.controller._send.assert_called_with("?FF")
+        self.controller.readFaultFlags.assert_not_called()
+        self.controller._readResponse.return_value = "FF=3\r"
+        for _ in range(5):
+            self.assertEqual(poller.pollOnce().values["fault_flags"], 3)
+        self.assertEqual(poller.faults.current.message, "Overheat Overvoltage")
+        self.assertEqual(
+            [call.args[0].value for call in on_fault_change.call_args_list], [0, 3]
+        )
+
+    def test_mobileBaseQueries(self):
+        """Checks the mobile base query set"""
+        base = MagicMock()
+        base.readMotorSpeedRatio.return_value = [4, 10]
+        base.readBatteryVoltage.return_value = 12
+        base.readFaultFlags.return_value = True
+        poller = TelemetryPoller(base, MOBILE_BASE_QUERIES)
+        self.assertEqual(poller.pollOnce().values["motor_speed_ratio"], [4, 10])
+
+    def test_lock(self):
+        """Checks queries run while holding the shared port lock"""
+        lock = threading.Lock()
+        self.controller.readBatteryVoltage.side_effect = lambda: lock.locked()
+        poller = TelemetryPoller(self.controller, lock=lock)
+        self.assertTrue(poller.pollOnce().values["battery_voltage"])
+
+    def test_stampAfterReads(self):
+        """Checks a snapshot is stamped when its readings are complete"""
+
+        def readBatteryVoltage():
+            # Time passes while the port is busy.
+            self.now = 6.0
+            return 24
+
+        self.controller.readBatteryVoltage.side_effect = readBatteryVoltage
+        self.assertEqual(self.poller.pollOnce().stamp, 6.0)
+
+    def test_background(self):
+        """Checks the poller thread keeps publishing until stopped"""
+        poller = TelemetryPoller(self.controller, rate_hz=200)
+        poller.start()
+        deadline = time.monotonic() + 2
+        while self.controller.readBatteryVoltage.call_count < 3:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        poller.stop()
+        calls = self.controller.readBatteryVoltage.call_count
+        time.sleep(0.05)
+        self.assertEqual(self.controller.readBatteryVoltage.call_count, calls)
+        self.assertEqual(poller.get("battery_voltage"), 24)
+
+    def test_restartAfterTimedOutStop(self):
+        """Checks a restart never leaves two threads polling"""
+        release = threading.Event()
+        calls = {}
+
+        def readBatteryVoltage():
+            thread = threading.current_thread()
+            calls[thread] = calls.get(thread, 0) + 1
+            release.wait()
+            return 24
+
+        self.controller.readBatteryVoltage.side_effect = readBatteryVoltage
+        poller = TelemetryPoller(self.controller, rate_hz=200)
+        poller.start()
+        deadline = time.monotonic() + 2
+        while not calls:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        (first,) = calls
+        # The first thread is stuck in a query, so stopping times out.
+        self.assertFalse(poller.stop(timeout=0.01))
+        poller.start()
+        release.set()
+        while len(calls) < 2 or max(calls.values()) < 5:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertTrue(poller.stop(timeout=1))
+        first.join(1)
+        self.assertFalse(first.is_alive())
+        # The old thread finished its stuck query and never polled again.
+        self.assertEqual(calls[first], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+# External modules.
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, NamedTuple, Optional
+
+# Internal modules.
+from roboteq_codec import parseReply
+from roboteq_faults import FAULT_FLAGS, DecodedFlags, FlagMonitor
+
+
+def readFaultBits(controller) -> int:
+    """Raw FF bitmask of a Roboteq. Unlike readFaultFlags this does not log,
+    so it is safe to poll; the poller logs changes through its monitor."""
+    controller._send("?FF")
+    reply = parseReply(controller._readResponse())
+    if reply.key != "FF":
+        raise ValueError(f"Unexpected reply to ?FF: {reply}")
+    return reply.value
+
+
+# Queries polled by default, keyed by the name they are published under.
+ROBOTEQ_QUERIES: Dict[str, Callable] = {
+    "motor_rpm_1": lambda controller: controller.readMotorSpeedRPM(1),
+    "motor_rpm_2": lambda controller: controller.readMotorSpeedRPM(2),
+    "battery_voltage": lambda controller: controller.readBatteryVoltage(),
+    "fault_flags": readFaultBits,
+}
+
+# "fault" is the boolean readFaultFlags returns, not the FF bitmask. The
+# driver logs an error on every call while a fault is active, so polling it
+# logs once per cycle.
+MOBILE_BASE_QUERIES: Dict[str, Callable] = {
+    "motor_speed_ratio": lambda base: base.readMotorSpeedRatio(),
+    "battery_voltage": lambda base: base.readBatteryVoltage(),
+    "fault": lambda base: base.readFaultFlags(),
+}
+
+
+class TelemetrySnapshot(NamedTuple):
+    """Result of one polling cycle. values only holds queries that
+    succeeded; errors holds the exception of every query that failed."""
+
+    stamp: float
+    values: Mapping[str, object]
+    errors: Mapping[str, Exception]
+
+
+class TelemetryPoller:
+    """Opt-in background poller for a Roboteq or MobileBase. Runs a set of
+    read queries at a fixed rate on its own thread and publishes each cycle
+    as an immutable TelemetrySnapshot, so any thread can read the latest
+    state through latest without touching the serial port.
+
+    The drivers do not serialize access to their ports, so anything else
+    sending commands on the same device must hold lock while it does. lock
+    can also be a CommandScheduler's lock, which lets safety commands
+    through ahead of the poller.
+    A "fault_flags" reading is decoded by faults, which calls
+    on_fault_change only when the flags differ from the previous poll. The
+    "fault" query of MOBILE_BASE_QUERIES calls readFaultFlags instead, which
+    logs an error on every poll for as long as a fault is active."""
+
+    def __init__(
+        self,
+        device,
+        queries: Optional[Dict[str, Callable]] = None,
+        rate_hz: float = 10.0,
+        lock=None,
+        clock: Callable[[], float] = time.monotonic,
+        on_fault_change: Optional[Callable[[DecodedFlags], None]] = None,
+    ):
+        self.device = device
+        self.queries = dict(queries if queries is not None else ROBOTEQ_QUERIES)
+        self.period = 1.0 / rate_hz
+        self.lock = lock if lock is not None else threading.Lock()
+        self._clock = clock
+        self.faults = FlagMonitor(FAULT_FLAGS, on_fault_change)
+        self._latest: Optional[TelemetrySnapshot] = None
+        # Each thread gets its own stop event, so restarting can never wake
+        # a thread that is still finishing its last cycle.
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def latest(self) -> Optional[TelemetrySnapshot]:
+        """Most recent snapshot, or None before the first poll. Snapshots
+        are replaced whole, so reading this never needs a lock."""
+        return self._latest
+
+    def get(self, name: str, default=None):
+        snapshot = self._latest
+        if snapshot is None:
+            return default
+        return snapshot.values.get(name, default)
+
+    def age(self) -> Optional[float]:
+        """Seconds since the latest snapshot was taken"""
+        snapshot = self._latest
+        return None if snapshot is None else self._clock() - snapshot.stamp
+
+    def pollOnce(self) -> TelemetrySnapshot:
+        values = {}
+        errors = {}
+        for name, query in self.queries.items():
+            # The lock is taken per query, so a command such as an estop
+            # only ever waits for one read instead of a whole cycle.
+            try:
+                with self.lock:
+                    values[name] = query(self.device)
+            except Exception as e:
+                errors[name] = e
+        # Stamped once the readings are in, so time spent waiting for the
+        # lock does not make them look older than they are.
+        stamp = self._clock()
+        if "fault_flags" in values:
+            self.faults.update(values["fault_flags"])
+        snapshot = TelemetrySnapshot(
+            stamp, MappingProxyType(values), MappingProxyType(errors)
+        )
+        self._latest = snapshot
+        return snapshot
+
+    def start(self) -> None:
+        running = self._thread is not None and self._thread.is_alive()
+        if running and not self._stop.is_set():
+            return
+        # A thread left over from a timed out stop exits after its current
+        # cycle; the new one polls with a fresh stop event.
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Stops polling. Returns False if the thread was still running a
+        query when timeout ran out; it exits once that query returns."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+            self._thread = None
+        return True
+
+    def _run(self, stop: threading.Event) -> None:
+        deadline = self._clock()
+        while not stop.is_set():
+            self.pollOnce()
+            # Keep a fixed rate; skip missed cycles instead of bursting.
+            deadline += self.period
+            now = self._clock()
+            if deadline < now:
+                deadline = now
+            stop.wait(deadline - now)
@@ -0,0 +1,95 @@
+# External modules.
+import math
+import unittest
+
+import numpy as np
+
+# Internal modules.
+from odometry import OdometryConfig, computeOdometry, ratioToRPM, wheelSpeedRPM
+
+
+# Class to test the batch odometry pipeline.
+class test_odometry(unittest.TestCase):
+
+    def setUp(self):
+        # Wheels travel 1 m per revolution on a 1 m wide base.
+        self.config = OdometryConfig(
+            gear_ratio=160, wheel_radius=1 / (2 * math.pi), track_width=1.0
+        )
+        self.times = np.linspace(0, 10, 101)
+
+    def test_wheelSpeedRPM(self):
+        """Checks motor speed is divided by the gear ratio"""
+        np.testing.assert_allclose(wheelSpeedRPM([160, -320]), [1, -2])
+        np.testing.assert_allclose(
+            wheelSpeedRPM(300, self.config._replace(gear_ratio=30)), 10
+        )
+
+    def test_ratioToRPM(self):
+        """Checks relative speed readings scale to max RPM"""
+        np.testing.assert_allclose(ratioToRPM([1000, -500]), [3000, -1500])
+
+    def test_straight(self):
+        """Checks driving forward at 60 wheel RPM moves 1 m/s along x"""
+        # Left motors are mirrored, as in MobileBase.move.
+        left = np.full(101, -60 * 160)
+        right = np.full(101, 60 * 160)
+        result = computeOdometry(self.times, left, right, self.config)
+        np.testing.assert_allclose(result.left_wheel_rpm, 60)
+        np.testing.assert_allclose(result.linear, 1)
+        np.testing.assert_allclose(result.angular, 0, atol=1e-12)
+        self.assertAlmostEqual(result.x[-1], 10)
+        self.assertAlmostEqual(result.y[-1], 0)
+
+    def test_rotation(self):
+        """Checks turning in place only changes heading"""
+        left = np.full(101, 30 * 160)
+        right = np.full(101, 30 * 160)
+        result = computeOdometry(self.times, left, right, self.config)
+        np.testing.assert_allclose(result.linear, 0, atol=1e-12)
+        np.testing.assert_allclose(result.angular, 1)
+        self.assertAlmostEqual(result.theta[-1], 10)
+        self.assertAlmostEqual(result.x[-1], 0)
+
+    def test_arc(self):
+        """Checks a constant twist follows a circle"""
+        left = np.full(101, -30 * 160)
+        right = np.full(101, 90 * 160)
+        result = computeOdometry(
+            self.times, left, right, self.config, initial_pose=(1.0, 2.0, 0.0)
+        )
+        # 1 m/s at 1 rad/s is a circle of radius 1 around (1, 3).
+        self.assertAlmostEqual(result.x[-1], 1 + math.sin(10), places=2)
+        self.assertAlmostEqual(result.y[-1], 3 - math.cos(10), places=2)
+
+    def test_twoDrivers(self):
+        """Checks front and rear readings on each side are averaged"""
+        left = np.column_stack([np.full(101, -50 * 160), np.full(101, -70 * 160)])
+        right = np.column_stack([np.full(101, 50 * 160), np.full(101, 70 * 160)])
+        result = computeOdometry(self.times, left, right, self.config)
+        np.testing.assert_allclose(result.left_wheel_rpm, 60)
+        np.testing.assert_allclose(result.right_wheel_rpm, 60)
+
+    def test_unsortedSamples(self):
+        """Checks samples are put in time order before integrating"""
+        order = np.random.default_rng(0).permutation(101)
+        left = np.full(101, -60 * 160)
+        right = np.full(101, 60 * 160)
+        result = computeOdometry(self.times[order], left, right, self.config)
+        np.testing.assert_allclose(result.times, self.times)
+        self.assertAlmostEqual(result.x[-1], 10)
+
+    def test_empty(self):
+        """Checks an empty batch gives empty results"""
+        result = computeOdometry(np.zeros(0), np.zeros(0), np.zeros(0))
+        for values in result:
+            self.assertEqual(values.shape, (0,))
+
+    def test_mismatchedLengths(self):
+        """Checks inputs of different lengths are rejected"""
+        with self.assertRaises(ValueError):
+            computeOdometry([0, 1], [0], [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
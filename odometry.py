@@ -0,0 +1,103 @@
+# External modules.
+import math
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+class OdometryConfig(NamedTuple):
+    """Drive train geometry. The defaults match MobileBase: a 160:1 gearbox
+    (as in readWheelSpeedRPM), channel 1 driving the left side and channel
+    2 the right, with the left motors mounted mirrored so forward motion
+    reads as negative speed on channel 1 (see MobileBase.move)."""
+
+    gear_ratio: float = 160.0
+    wheel_radius: float = 0.1
+    track_width: float = 0.5
+    # Motor RPM at BSR = 1000, used to convert relative speed readings.
+    max_rpm: float = 3000.0
+    left_direction: float = -1.0
+    right_direction: float = 1.0
+
+
+class OdometryResult(NamedTuple):
+    """Per-sample wheel speeds (RPM), body twist (m/s, rad/s) and pose
+    (m, m, rad) integrated from the first sample"""
+
+    times: np.ndarray
+    left_wheel_rpm: np.ndarray
+    right_wheel_rpm: np.ndarray
+    linear: np.ndarray
+    angular: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    theta: np.ndarray
+
+
+def ratioToRPM(bsr, config: OdometryConfig = OdometryConfig()) -> np.ndarray:
+    """Converts relative speed readings (?BSR, +-1000) to motor RPM"""
+    return np.asarray(bsr, dtype=float) * config.max_rpm / 1000.0
+
+
+def wheelSpeedRPM(motor_rpm, config: OdometryConfig = OdometryConfig()) -> np.ndarray:
+    """Converts motor RPM readings (?BS) to wheel RPM"""
+    return np.asarray(motor_rpm, dtype=float) / config.gear_ratio
+
+
+def computeOdometry(
+    times,
+    left_motor_rpm,
+    right_motor_rpm,
+    config: OdometryConfig = OdometryConfig(),
+    initial_pose: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+) -> OdometryResult:
+    """Computes wheel speeds, twist and integrated pose for a batch of
+    timestamped motor speed samples in one pass.
+
+    left_motor_rpm and right_motor_rpm have shape (n,) or (n, k) for k
+    drivers per side (front and rear axle), in which case each side is
+    averaged. Samples are sorted by time first. The pose is integrated
+    with the midpoint rule between consecutive samples."""
+    times = np.asarray(times, dtype=float)
+    left = np.asarray(left_motor_rpm, dtype=float)
+    right = np.asarray(right_motor_rpm, dtype=float)
+    if left.ndim == 2:
+        left = left.mean(axis=1)
+    if right.ndim == 2:
+        right = right.mean(axis=1)
+    if not (times.shape == left.shape == right.shape) or times.ndim != 1:
+        raise ValueError("times and motor speeds must have the same length")
+
+    order = np.argsort(times, kind="stable")
+    times, left, right = times[order], left[order], right[order]
+
+    left_wheel = wheelSpeedRPM(left, config) * config.left_direction
+    right_wheel = wheelSpeedRPM(right, config) * config.right_direction
+    # Wheel rim speed in m/s.
+    rpm_to_speed = 2.0 * math.pi * config.wheel_radius / 60.0
+    left_speed = left_wheel * rpm_to_speed
+    right_speed = right_wheel * rpm_to_speed
+    linear = (left_speed + right_speed) / 2.0
+    angular = (right_speed - left_speed) / config.track_width
+
+    x0, y0, theta0 = initial_pose
+    if len(times) == 0:
+        # An empty log chunk has no pose either.
+        empty = np.empty(0)
+        return OdometryResult(
+            times, left_wheel, right_wheel, linear, angular, empty, empty, empty
+        )
+    dt = np.diff(times)
+    angular_mid = (angular[1:] + angular[:-1]) / 2.0
+    linear_mid = (linear[1:] + linear[:-1]) / 2.0
+    theta = np.empty_like(times)
+    theta[0] = theta0
+    theta[1:] = theta0 + np.cumsum(angular_mid * dt)
+    heading_mid = (theta[1:] + theta[:-1]) / 2.0
+    x = np.empty_like(times)
+    y = np.empty_like(times)
+    x[0], y[0] = x0, y0
+    x[1:] = x0 + np.cumsum(linear_mid * np.cos(heading_mid) * dt)
+    y[1:] = y0 + np.cumsum(linear_mid * np.sin(heading_mid) * dt)
+
+    return OdometryResult(times, left_wheel, right_wheel, linear, angular, x, y, theta)
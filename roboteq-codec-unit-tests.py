@@ -0,0 +1,73 @@
+# External modules.
+import unittest
+
+# Internal modules.
+from roboteq_codec import Reply, encodeCommand, parseReply
+from roboteq_simulator import SimulatedRoboteq, VirtualClock
+
+
+# Class to test the roboteq command encoder and reply parser.
+class test_roboteq_codec(unittest.TestCase):
+
+    def test_encodeCommand(self):
+        """Checks commands encode to the bytes the driver writes"""
+        self.assertEqual(encodeCommand("!G", 1, 10), b"!G 1 10\r")
+        self.assertEqual(encodeCommand("!G", 2, -1000), b"!G 2 -1000\r")
+        self.assertEqual(encodeCommand("!MS", 1), b"!MS 1\r")
+        self.assertEqual(encodeCommand("!EX"), b"!EX\r")
+        self.assertEqual(encodeCommand("!MG"), b"!MG\r")
+        self.assertEqual(encodeCommand("?FF"), b"?FF\r")
+        self.assertEqual(encodeCommand("?BS", 1), b"?BS 1\r")
+        self.assertEqual(encodeCommand("?BSR", 2), b"?BSR 2\r")
+        self.assertEqual(encodeCommand("?V", 2), b"?V 2\r")
+        self.assertEqual(encodeCommand("?V"), b"?V\r")
+
+    def test_precomputed(self):
+        """Checks constant commands are not rebuilt per call"""
+        self.assertIs(encodeCommand("?BS", 1), encodeCommand("?BS", 1))
+        self.assertIs(encodeCommand("!EX"), encodeCommand("!EX"))
+
+    def test_unknownCommand(self):
+        """Checks unknown commands and channels are rejected"""
+        with self.assertRaises(ValueError):
+            encodeCommand("!X")
+        with self.assertRaises(ValueError):
+            encodeCommand("?BS", 3)
+        with self.assertRaises(ValueError):
+            encodeCommand("!G", 3, 10)
+
+    def test_parseReply(self):
+        """Checks replies are dispatched on their key"""
+        self.assertEqual(parseReply("BS=100\r"), Reply("BS", 100))
+        self.assertEqual(parseReply(b"BSR=-100\r"), Reply("BSR", -100))
+        self.assertEqual(parseReply("V=100"), Reply("V", 100))
+        self.assertEqual(parseReply("FF=3\r"), Reply("FF", 3))
+        self.assertEqual(parseReply("V=120:240:5000\r"), Reply("V", (120, 240, 5000)))
+        self.assertEqual(parseReply("+\r"), Reply("+", True))
+        self.assertEqual(parseReply("-\r"), Reply("-", False))
+
+    def test_badReply(self):
+        """Checks unknown keys and malformed values are rejected"""
+        for reply in ("Hello\r", "XX=1\r", "BS=\r", "BS=fast\r", ""):
+            with self.assertRaises(ValueError):
+                parseReply(reply)
+
+    def test_simulatedController(self):
+        """Checks encoded commands round trip through the simulator"""
+        device = SimulatedRoboteq(timeout=0.1, clock=VirtualClock())
+        for command, expected in (
+            (encodeCommand("!G", 1, 500), Reply("+", True)),
+            (encodeCommand("?FF"), Reply("FF", 0)),
+            (encodeCommand("?BS", 2), Reply("BS", 0)),
+            (encodeCommand("?V", 2), Reply("V", 240)),
+            (encodeCommand("?V"), Reply("V", (120, 240, 5000))),
+        ):
+            device.write(command)
+            response = b""
+            while not response.endswith(b"\r"):
+                response += device.read()
+            self.assertEqual(parseReply(response), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
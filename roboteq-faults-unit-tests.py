@@ -0,0 +1,84 @@
+# External modules.
+import unittest
+from unittest.mock import MagicMock
+
+# Internal modules.
+from roboteq_faults import (
+    FAULT_FLAGS,
+    MOTOR_FLAGS,
+    STATUS_FLAGS,
+    FaultFlag,
+    FlagMonitor,
+    MotorFlag,
+    StatusFlag,
+)
+
+
+# Class to test fault and status flag decoding.
+class test_roboteq_faults(unittest.TestCase):
+
+    def test_driverMessages(self):
+        """Checks FF messages read like the driver's log messages"""
+        expected = {
+            1: "Overheat",
+            2: "Overvoltage",
+            3: "Overheat Overvoltage",
+            4: "Undervoltage",
+            5: "Overheat Undervoltage",
+            6: "Overvoltage Undervoltage",
+            7: "Overheat Overvoltage Undervoltage",
+            8: "Short circuit",
+        }
+        for value, message in expected.items():
+            self.assertEqual(FAULT_FLAGS.decode(value).message, message)
+
+    def test_flags(self):
+        """Checks every set bit is reported as a flag"""
+        decoded = FAULT_FLAGS.decode(FaultFlag.OVERHEAT | FaultFlag.EMERGENCY_STOP)
+        self.assertEqual(decoded.flags, {FaultFlag.OVERHEAT, FaultFlag.EMERGENCY_STOP})
+        self.assertEqual(decoded.unknown, 0)
+        self.assertEqual(FAULT_FLAGS.decode(0).flags, frozenset())
+        self.assertEqual(FAULT_FLAGS.decode(0).message, "")
+        self.assertEqual(len(FAULT_FLAGS.decode(255).flags), 8)
+
+    def test_precomputed(self):
+        """Checks every 8 bit value comes from the table"""
+        for value in range(256):
+            self.assertIs(FAULT_FLAGS.decode(value), FAULT_FLAGS.decode(value))
+            self.assertEqual(FAULT_FLAGS.decode(value).value, value)
+
+    def test_unknownBits(self):
+        """Checks bits without a name are kept and reported"""
+        decoded = FAULT_FLAGS.decode(256 + 8)
+        self.assertEqual(decoded.flags, {FaultFlag.SHORT_CIRCUIT})
+        self.assertEqual(decoded.unknown, 256)
+        self.assertEqual(decoded.message, "Short circuit FF=256")
+        self.assertEqual(STATUS_FLAGS.decode(64).message, "FS=64")
+
+    def test_statusFlags(self):
+        """Checks the FS and FM decoders"""
+        decoded = STATUS_FLAGS.decode(1 | 16)
+        self.assertEqual(
+            decoded.flags, {StatusFlag.SERIAL_MODE, StatusFlag.STALL_DETECTED}
+        )
+        self.assertEqual(decoded.message, "Serial mode Stall detected")
+        self.assertEqual(MOTOR_FLAGS.decode(2).flags, {MotorFlag.STALLED})
+
+    def test_monitor(self):
+        """Checks only changes are reported"""
+        on_change = MagicMock()
+        monitor = FlagMonitor(on_change=on_change)
+        self.assertEqual(monitor.update(0).message, "")
+        self.assertIsNone(monitor.update(0))
+        self.assertEqual(monitor.update(2).message, "Overvoltage")
+        for _ in range(50):
+            self.assertIsNone(monitor.update(2))
+        self.assertEqual(monitor.update(0).value, 0)
+        self.assertEqual(
+            [call.args[0].value for call in on_change.call_args_list], [0, 2, 0]
+        )
+        self.assertEqual(monitor.current.value, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
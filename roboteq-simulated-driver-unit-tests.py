@@ -0,0 +1,43 @@
+# External modules.
+import unittest
+from unittest.mock import patch
+
+# Internal modules.
+from roboteq_simulator import SimulatedRoboteqFactory, VirtualClock
+from unloading_robot_hal.roboteq_driver import Roboteq  # type: ignore
+
+
+# Class to test the roboteq driver against the simulated device.
+class test_roboteq_driver_simulated(unittest.TestCase):
+
+    def setUp(self):
+        # Replace serial.Serial with simulated controllers.
+        self.clock = VirtualClock()
+        self.factory = SimulatedRoboteqFactory(clock=self.clock)
+        with patch("serial.Serial", side_effect=self.factory):
+            self.controller = Roboteq("COM3")
+        self.device = self.factory.devices["COM3"]
+
+    def test_setSpeed(self):
+        """Checks a speed command spins up the simulated motor"""
+        self.controller.setSpeed(500, 1)
+        self.clock.advance(1)
+        self.assertAlmostEqual(self.controller.readMotorSpeedRPM(1), 1500, delta=1)
+
+    def test_readFaultFlags(self):
+        """Checks an injected fault is reported by the driver"""
+        with patch("rospy.logerr") as mock_logerr:
+            self.device.injectFault(2)
+            self.assertTrue(self.controller.readFaultFlags())
+            self.assertEqual(
+                f"{mock_logerr.call_args_list[-1]}",
+                "call('[ERROR] ROBOTEQ: Overvoltage fault.')",
+            )
+
+    def test_readBatteryVoltage(self):
+        """Checks battery voltage comes back in volts"""
+        self.assertEqual(self.controller.readBatteryVoltage(), 24)
+
+
+if __name__ == "__main__":
+    unittest.main()
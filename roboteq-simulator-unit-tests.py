@@ -0,0 +1,135 @@
+# External modules.
+import threading
+import time
+import unittest
+
+import serial
+
+# Internal modules.
+from roboteq_simulator import RealClock, SimulatedRoboteq, VirtualClock
+
+
+# Class to test the simulated roboteq device on its own.
+class test_roboteq_simulator(unittest.TestCase):
+
+    def setUp(self):
+        # Deterministic clock and a simulated controller at 115200 baud.
+        self.clock = VirtualClock()
+        self.device = SimulatedRoboteq(
+            "COM3", 115200, timeout=0.1, clock=self.clock, processing_delay=0.001
+        )
+
+    def readLine(self) -> bytes:
+        response = b""
+        while not response.endswith(b"\r"):
+            response += self.device.read()
+        return response
+
+    def test_commands(self):
+        """Checks every supported command gets the expected reply"""
+        self.device.write(b"!G 1 10\r")
+        self.assertEqual(self.readLine(), b"+\r")
+        self.device.write(b"!MS 1\r")
+        self.assertEqual(self.readLine(), b"+\r")
+        self.device.write(b"!EX\r")
+        self.assertEqual(self.readLine(), b"+\r")
+        self.device.write(b"!MG\r")
+        self.assertEqual(self.readLine(), b"+\r")
+        self.device.write(b"?FF\r")
+        self.assertEqual(self.readLine(), b"FF=0\r")
+        self.device.write(b"?V 2\r")
+        self.assertEqual(self.readLine(), b"V=240\r")
+        self.device.write(b"?V\r")
+        self.assertEqual(self.readLine(), b"V=120:240:5000\r")
+        self.device.write(b"?BOGUS\r")
+        self.assertEqual(self.readLine(), b"-\r")
+
+    def test_timing(self):
+        """Checks a reply takes line time plus processing time"""
+        self.device.write(b"?FF\r")
+        self.assertEqual(self.readLine(), b"FF=0\r")
+        # 4 bytes out and 5 bytes back at 10 bits per byte.
+        expected = 9 * 10 / 115200 + 0.001
+        self.assertAlmostEqual(self.clock.now(), expected)
+
+    def test_partialRead(self):
+        """Checks only bytes already on the line can be read"""
+        self.device.write(b"?FF\r")
+        self.assertEqual(self.device.in_waiting, 0)
+        byte_time = 10 / 115200
+        self.clock.advance(4 * byte_time + 0.001 + 2.5 * byte_time)
+        self.assertEqual(self.device.in_waiting, 2)
+        # Asking for more than will arrive waits for the read timeout.
+        self.assertEqual(self.device.read(10), b"FF=0\r")
+        self.assertAlmostEqual(self.clock.now(), 6.5 * byte_time + 0.101)
+
+    def test_motorDynamics(self):
+        """Checks motors approach their setpoint and stop on estop"""
+        self.device.write(b"!G 1 500\r")
+        self.readLine()
+        self.clock.advance(1)
+        self.assertAlmostEqual(self.device.motorRPM(1), 1500, delta=1)
+        self.assertEqual(self.device.motorRPM(2), 0)
+        self.device.write(b"?BSR 1\r")
+        self.assertEqual(self.readLine(), b"BSR=500\r")
+        # Estop latches until released.
+        self.device.write(b"!EX\r!G 1 500\r")
+        self.readLine()
+        self.readLine()
+        self.clock.advance(1)
+        self.assertAlmostEqual(self.device.motorRPM(1), 0, delta=1)
+
+    def test_faultInjection(self):
+        """Checks injected faults are reported and halt the motors"""
+        self.device.write(b"!G 2 1000\r")
+        self.readLine()
+        self.clock.advance(1)
+        self.device.injectFault(4)
+        self.clock.advance(1)
+        self.device.write(b"?FF\r?BS 2\r")
+        self.assertEqual(self.readLine(), b"FF=4\r")
+        self.assertEqual(self.readLine(), b"BS=0\r")
+
+    def test_unresponsive(self):
+        """Checks a hung controller makes reads time out"""
+        self.device.setResponsive(False)
+        self.device.write(b"?FF\r")
+        self.assertEqual(self.device.read(), b"")
+        self.assertAlmostEqual(self.clock.now(), 0.1)
+
+    def test_unboundedRead(self):
+        """Checks a read without timeout never returns early"""
+        self.device.timeout = None
+        # Nothing can arrive on a virtual clock, so waiting would hang.
+        with self.assertRaises(serial.SerialException):
+            self.device.read()
+
+        # On the real clock the read waits for a later write.
+        device = SimulatedRoboteq(timeout=None, clock=RealClock())
+        writer = threading.Timer(0.05, lambda: device.write(b"?FF\r"))
+        start = time.monotonic()
+        writer.start()
+        self.assertEqual(device.read(5), b"FF=0\r")
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+        # Closing the port wakes a blocked read.
+        closer = threading.Timer(0.05, device.close)
+        closer.start()
+        with self.assertRaises(serial.SerialException):
+            device.read()
+
+    def test_droppedBytes(self):
+        """Checks dropped bytes are deterministic for a given seed"""
+        replies = []
+        for _ in range(2):
+            device = SimulatedRoboteq(
+                timeout=0.1, clock=VirtualClock(), drop_rate=0.3, seed=7
+            )
+            device.write(b"?V\r" * 10)
+            replies.append(device.read(1000))
+        self.assertEqual(replies[0], replies[1])
+        self.assertLess(len(replies[0]), len(b"V=120:240:5000\r" * 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# External modules.
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+CHANNELS = (1, 2)
+# ?V takes 1 (internal), 2 (battery) or 3 (5V output).
+VOLTAGE_CHANNELS = (1, 2, 3)
+
+# Every command without a free value, encoded once, keyed by name and
+# arguments. Lookups replace formatting and encoding on the hot path.
+ENCODED_COMMANDS: Dict[Tuple, bytes] = {}
+for _name in ("!EX", "!MG", "?FF", "?FS", "?FM", "?V"):
+    ENCODED_COMMANDS[(_name,)] = f"{_name}\r".encode()
+for _name in ("!MS", "?BS", "?BSR", "?FM"):
+    for _channel in CHANNELS:
+        ENCODED_COMMANDS[(_name, _channel)] = f"{_name} {_channel}\r".encode()
+for _channel in VOLTAGE_CHANNELS:
+    ENCODED_COMMANDS[("?V", _channel)] = f"?V {_channel}\r".encode()
+
+# Commands ending in a value; only the value is formatted per call.
+ENCODED_PREFIXES: Dict[Tuple, bytes] = {
+    ("!G", _channel): f"!G {_channel} ".encode() for _channel in CHANNELS
+}
+
+
+def encodeCommand(name: str, *args: int) -> bytes:
+    """Wire bytes for a command, e.g. encodeCommand("!G", 1, 10) returns
+    b"!G 1 10\\r" """
+    key = (name, *args)
+    encoded = ENCODED_COMMANDS.get(key)
+    if encoded is not None:
+        return encoded
+    prefix = ENCODED_PREFIXES.get(key[:-1]) if args else None
+    if prefix is None:
+        raise ValueError(f"Unknown command {' '.join(map(str, key))}")
+    return prefix + b"%d\r" % args[-1]
+
+
+class Reply(NamedTuple):
+    """Parsed controller reply. key is the query name ("BS", "V", ...) or
+    "+"/"-" for command acknowledgements, with value True/False."""
+
+    key: str
+    value: object
+
+
+def _parseInts(text: str) -> Union[int, Tuple[int, ...]]:
+    """One integer, or a tuple for multi-value replies such as V=a:b:c"""
+    if ":" in text:
+        return tuple(int(part) for part in text.split(":"))
+    return int(text)
+
+
+# Parser for the value of each reply key. New queries are added here.
+REPLY_PARSERS: Dict[str, Callable[[str], object]] = {
+    "BS": _parseInts,
+    "BSR": _parseInts,
+    "V": _parseInts,
+    "FF": _parseInts,
+    "FS": _parseInts,
+    "FM": _parseInts,
+}
+
+_ACKNOWLEDGEMENTS = {"+": Reply("+", True), "-": Reply("-", False)}
+
+
+def parseReply(reply: Union[str, bytes]) -> Reply:
+    """Parses one reply line, with or without its trailing carriage return"""
+    if isinstance(reply, bytes):
+        reply = reply.decode(errors="replace")
+    reply = reply.strip()
+    acknowledgement = _ACKNOWLEDGEMENTS.get(reply)
+    if acknowledgement is not None:
+        return acknowledgement
+    key, separator, text = reply.partition("=")
+    parser: Optional[Callable[[str], object]] = REPLY_PARSERS.get(key)
+    if not separator or parser is None:
+        raise ValueError(f"Unexpected reply {reply!r}")
+    return Reply(key, parser(text))
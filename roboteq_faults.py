@@ -0,0 +1,141 @@
+# External modules.
+from enum import IntFlag
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+
+class FaultFlag(IntFlag):
+    """Bits of the ?FF fault flags reply"""
+
+    OVERHEAT = 1
+    OVERVOLTAGE = 2
+    UNDERVOLTAGE = 4
+    SHORT_CIRCUIT = 8
+    EMERGENCY_STOP = 16
+    SETUP_FAULT = 32
+    MOSFET_FAILURE = 64
+    DEFAULT_CONFIGURATION = 128
+
+
+class StatusFlag(IntFlag):
+    """Bits of the ?FS status flags reply"""
+
+    SERIAL_MODE = 1
+    PULSE_MODE = 2
+    ANALOG_MODE = 4
+    POWER_STAGE_OFF = 8
+    STALL_DETECTED = 16
+    AT_LIMIT = 32
+    MICROBASIC_RUNNING = 128
+
+
+class MotorFlag(IntFlag):
+    """Bits of the ?FM per motor status reply"""
+
+    AMPS_LIMIT = 1
+    STALLED = 2
+    LOOP_ERROR = 4
+    SAFETY_STOP = 8
+    FORWARD_LIMIT = 16
+    REVERSE_LIMIT = 32
+    AMPS_TRIGGER = 64
+
+
+# Names used in messages. The FF names match the driver's log messages.
+FAULT_NAMES = {
+    FaultFlag.OVERHEAT: "Overheat",
+    FaultFlag.OVERVOLTAGE: "Overvoltage",
+    FaultFlag.UNDERVOLTAGE: "Undervoltage",
+    FaultFlag.SHORT_CIRCUIT: "Short circuit",
+    FaultFlag.EMERGENCY_STOP: "Emergency stop",
+    FaultFlag.SETUP_FAULT: "Motor/sensor setup",
+    FaultFlag.MOSFET_FAILURE: "MOSFET failure",
+    FaultFlag.DEFAULT_CONFIGURATION: "Default configuration loaded",
+}
+
+STATUS_NAMES = {
+    StatusFlag.SERIAL_MODE: "Serial mode",
+    StatusFlag.PULSE_MODE: "Pulse mode",
+    StatusFlag.ANALOG_MODE: "Analog mode",
+    StatusFlag.POWER_STAGE_OFF: "Power stage off",
+    StatusFlag.STALL_DETECTED: "Stall detected",
+    StatusFlag.AT_LIMIT: "At limit",
+    StatusFlag.MICROBASIC_RUNNING: "MicroBasic running",
+}
+
+MOTOR_NAMES = {
+    MotorFlag.AMPS_LIMIT: "Amps limit",
+    MotorFlag.STALLED: "Stalled",
+    MotorFlag.LOOP_ERROR: "Loop error",
+    MotorFlag.SAFETY_STOP: "Safety stop",
+    MotorFlag.FORWARD_LIMIT: "Forward limit",
+    MotorFlag.REVERSE_LIMIT: "Reverse limit",
+    MotorFlag.AMPS_TRIGGER: "Amps trigger",
+}
+
+
+class DecodedFlags(NamedTuple):
+    """One flags reading. flags holds the known bits that are set and
+    unknown the raw value of any other set bits."""
+
+    value: int
+    flags: FrozenSet[IntFlag]
+    unknown: int
+    message: str
+
+
+class FlagDecoder:
+    """Decodes a flags register through a table precomputed for every
+    value it can hold, so decoding a reading is a single lookup"""
+
+    def __init__(self, register: str, names: Dict[IntFlag, str], bits: int = 8):
+        self.register = register
+        # Members in bit order, with the name used for each in messages.
+        self._names = tuple(sorted(names.items()))
+        self._table: Tuple[DecodedFlags, ...] = tuple(
+            self._decode(value) for value in range(1 << bits)
+        )
+
+    def decode(self, value: int) -> DecodedFlags:
+        if 0 <= value < len(self._table):
+            return self._table[value]
+        return self._decode(value)
+
+    def _decode(self, value: int) -> DecodedFlags:
+        set_bits = [(member, name) for member, name in self._names if value & member]
+        flags = frozenset(member for member, _ in set_bits)
+        unknown = value & ~sum(flags)
+        names = [name for _, name in set_bits]
+        if unknown:
+            names.append(f"{self.register}={unknown}")
+        return DecodedFlags(value, flags, unknown, " ".join(names))
+
+
+FAULT_FLAGS = FlagDecoder("FF", FAULT_NAMES)
+STATUS_FLAGS = FlagDecoder("FS", STATUS_NAMES)
+MOTOR_FLAGS = FlagDecoder("FM", MOTOR_NAMES)
+
+
+class FlagMonitor:
+    """Tracks one flags register across polls and reports a reading only
+    when it differs from the previous one, so a fault that stays active is
+    logged once instead of on every poll."""
+
+    def __init__(
+        self,
+        decoder: FlagDecoder = FAULT_FLAGS,
+        on_change: Optional[Callable[[DecodedFlags], None]] = None,
+    ):
+        self.decoder = decoder
+        self.on_change = on_change
+        self.current: Optional[DecodedFlags] = None
+
+    def update(self, value: int) -> Optional[DecodedFlags]:
+        """Returns the decoded reading if it changed, otherwise None"""
+        current = self.current
+        if current is not None and current.value == value:
+            return None
+        decoded = self.decoder.decode(value)
+        self.current = decoded
+        if self.on_change is not None:
+            self.on_change(decoded)
+        return decoded
@@ -0,0 +1,370 @@
+# External modules.
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import serial
+
+
+class RealClock:
+    """Wall clock used when the simulator should add real latency"""
+
+    # Reads may block until another thread writes.
+    can_block = True
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep_until(self, deadline: float) -> None:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class VirtualClock:
+    """Manually advanced clock that makes the simulator fully deterministic.
+    Waiting advances the clock instantly, so it should only be driven from
+    one thread."""
+
+    # Nothing else can write while a read waits, so blocking would hang.
+    can_block = False
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep_until(self, deadline: float) -> None:
+        if deadline > self._now:
+            self._now = deadline
+
+    def advance(self, seconds: float) -> None:
+        self._now += seconds
+
+
+class SimulatedRoboteq:
+    """In-process stand-in for the serial.Serial instance a Roboteq driver
+    talks to. Implements the !G, !MS, !EX, !MG, ?FF, ?BS, ?BSR and ?V
+    commands, models line time at the configured baud rate, controller
+    processing time, first order motor dynamics, dropped reply bytes and
+    injected faults."""
+
+    def __init__(
+        self,
+        port: Optional[str] = None,
+        baudrate: int = 115200,
+        bytesize: int = 8,
+        parity: str = "N",
+        stopbits: float = 1,
+        timeout: Optional[float] = None,
+        *args,
+        clock=None,
+        processing_delay: float = 0.0005,
+        max_rpm: float = 3000.0,
+        motor_time_constant: float = 0.1,
+        battery_voltage: float = 24.0,
+        internal_voltage: float = 12.0,
+        drop_rate: float = 0.0,
+        seed: int = 0,
+        **kwargs,
+    ):
+        # Serial port settings, named like their pyserial equivalents.
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.is_open = True
+        self._bits_per_byte = 1 + bytesize + stopbits + (0 if parity == "N" else 1)
+
+        # Simulation settings.
+        self.clock = clock if clock is not None else RealClock()
+        self.processing_delay = processing_delay
+        self.max_rpm = max_rpm
+        self.motor_time_constant = motor_time_constant
+        self.battery_voltage = battery_voltage
+        self.internal_voltage = internal_voltage
+        self.drop_rate = drop_rate
+        self.responsive = True
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._data_ready = threading.Condition(self._lock)
+
+        # Controller state.
+        self.fault_flags = 0
+        self.estopped = False
+        self._commands = {1: 0, 2: 0}
+        self._stopped = {1: False, 2: False}
+        self._rpm = {1: 0.0, 2: 0.0}
+        self._motor_time = self.clock.now()
+
+        # Line state. Each received byte is stored with its arrival time.
+        self._rx: Deque[Tuple[float, int]] = deque()
+        self._partial_command = bytearray()
+        self._tx_free = 0.0
+        self._rx_free = 0.0
+        self._device_free = 0.0
+
+        # Every command the controller received, with its arrival time.
+        self.received: List[Tuple[float, str]] = []
+
+    # ------------------------------------------------------------------
+    # pyserial interface
+    # ------------------------------------------------------------------
+
+    @property
+    def byte_time(self) -> float:
+        """Seconds needed to put a single byte on the line"""
+        return self._bits_per_byte / self.baudrate
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        with self._lock:
+            self.is_open = False
+            self._data_ready.notify_all()
+
+    def flush(self) -> None:
+        self._checkOpen()
+        self.clock.sleep_until(self._tx_free)
+
+    def reset_input_buffer(self) -> None:
+        with self._lock:
+            now = self.clock.now()
+            while self._rx and self._rx[0][0] <= now:
+                self._rx.popleft()
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            return self._available(self.clock.now())
+
+    def write(self, data: bytes) -> int:
+        self._checkOpen()
+        with self._lock:
+            start = max(self.clock.now(), self._tx_free)
+            for offset, byte in enumerate(bytes(data)):
+                if byte == ord("\r"):
+                    arrival = start + (offset + 1) * self.byte_time
+                    command = self._partial_command.decode(errors="replace")
+                    self._partial_command.clear()
+                    self._handleCommand(command.strip(), arrival)
+                else:
+                    self._partial_command.append(byte)
+            self._tx_free = start + len(data) * self.byte_time
+            self._data_ready.notify_all()
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        self._checkOpen()
+        with self._lock:
+            # Like pyserial, a read without timeout blocks until size bytes
+            # have been queued by later writes.
+            while self.timeout is None and len(self._rx) < size:
+                if not self.clock.can_block:
+                    raise serial.SerialException(
+                        "read without timeout would block forever"
+                    )
+                self._data_ready.wait()
+                self._checkOpen()
+            now = self.clock.now()
+            if size <= len(self._rx):
+                ready = self._rx[size - 1][0] if size > 0 else now
+            else:
+                # Not enough bytes are queued; wait for the read timeout.
+                ready = math.inf
+            if self.timeout is not None:
+                ready = min(ready, now + self.timeout)
+        self.clock.sleep_until(ready)
+        with self._lock:
+            count = min(size, self._available(self.clock.now()))
+            return bytes(self._rx.popleft()[1] for _ in range(count))
+
+    # ------------------------------------------------------------------
+    # Test and fault injection helpers
+    # ------------------------------------------------------------------
+
+    def injectFault(self, flags: int) -> None:
+        """Sets the FF fault bits; any fault stops both motors"""
+        with self._lock:
+            self._updateMotors(self.clock.now())
+            self.fault_flags |= flags
+
+    def clearFaults(self) -> None:
+        with self._lock:
+            self._updateMotors(self.clock.now())
+            self.fault_flags = 0
+
+    def setResponsive(self, responsive: bool) -> None:
+        """Makes the controller stop (or resume) answering commands"""
+        self.responsive = responsive
+
+    def motorRPM(self, channel: int) -> float:
+        with self._lock:
+            self._updateMotors(self.clock.now())
+            return self._rpm[channel]
+
+    def motorCommand(self, channel: int) -> int:
+        return self._commands[channel]
+
+    # ------------------------------------------------------------------
+    # Protocol
+    # ------------------------------------------------------------------
+
+    def _handleCommand(self, command: str, arrival: float) -> None:
+        self.received.append((arrival, command))
+        if not self.responsive:
+            return
+        # The controller handles one command at a time.
+        handled = max(arrival, self._device_free) + self.processing_delay
+        self._device_free = handled
+        self._updateMotors(handled)
+        reply = self._execute(command.split())
+        self._schedule(f"{reply}\r".encode(), handled)
+
+    def _execute(self, words: List[str]) -> str:
+        if not words:
+            return "-"
+        name, args = words[0].upper(), words[1:]
+        try:
+            handler = self._handlers[name]
+        except KeyError:
+            return "-"
+        try:
+            return handler(self, *[int(arg) for arg in args])
+        except (TypeError, ValueError, KeyError):
+            return "-"
+
+    def _setSpeed(self, channel: int, value: int) -> str:
+        self._checkChannel(channel)
+        self._commands[channel] = max(-1000, min(1000, value))
+        self._stopped[channel] = False
+        return "+"
+
+    def _stopMotor(self, channel: int) -> str:
+        self._checkChannel(channel)
+        self._commands[channel] = 0
+        self._stopped[channel] = True
+        return "+"
+
+    def _estop(self) -> str:
+        self.estopped = True
+        return "+"
+
+    def _releaseEstop(self) -> str:
+        self.estopped = False
+        return "+"
+
+    def _queryFaultFlags(self) -> str:
+        return f"FF={self.fault_flags}"
+
+    def _queryMotorSpeed(self, channel: int) -> str:
+        self._checkChannel(channel)
+        return f"BS={round(self._rpm[channel])}"
+
+    def _queryMotorSpeedRatio(self, channel: int) -> str:
+        self._checkChannel(channel)
+        return f"BSR={round(self._rpm[channel] / self.max_rpm * 1000)}"
+
+    def _queryVoltage(self, channel: Optional[int] = None) -> str:
+        # Internal and battery volts are reported in tenths, 5V output in mV.
+        values = [
+            round(self.internal_voltage * 10),
+            round(self.battery_voltage * 10),
+            5000,
+        ]
+        if channel is None:
+            return "V=" + ":".join(str(value) for value in values)
+        return f"V={values[channel - 1]}" if 1 <= channel <= 3 else "-"
+
+    _handlers: Dict[str, Callable[..., str]] = {
+        "!G": _setSpeed,
+        "!MS": _stopMotor,
+        "!EX": _estop,
+        "!MG": _releaseEstop,
+        "?FF": _queryFaultFlags,
+        "?BS": _queryMotorSpeed,
+        "?BSR": _queryMotorSpeedRatio,
+        "?V": _queryVoltage,
+    }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _checkOpen(self) -> None:
+        if not self.is_open:
+            raise serial.SerialException("Attempting to use a port that is not open")
+
+    @staticmethod
+    def _checkChannel(channel: int) -> None:
+        if channel not in (1, 2):
+            raise ValueError(channel)
+
+    def _schedule(self, reply: bytes, ready: float) -> None:
+        """Queues reply bytes at the time each one finishes arriving"""
+        start = max(ready, self._rx_free)
+        for offset, byte in enumerate(reply):
+            if self.drop_rate and self._random.random() < self.drop_rate:
+                continue
+            self._rx.append((start + (offset + 1) * self.byte_time, byte))
+        self._rx_free = start + len(reply) * self.byte_time
+
+    def _available(self, now: float) -> int:
+        count = 0
+        for arrival, _ in self._rx:
+            if arrival > now:
+                break
+            count += 1
+        return count
+
+    def _updateMotors(self, now: float) -> None:
+        """Moves each motor toward its setpoint with a first order lag"""
+        elapsed = now - self._motor_time
+        if elapsed <= 0:
+            return
+        self._motor_time = now
+        decay = math.exp(-elapsed / self.motor_time_constant)
+        halted = self.estopped or self.fault_flags != 0
+        for channel in self._rpm:
+            target = 0.0
+            if not halted and not self._stopped[channel]:
+                target = self._commands[channel] / 1000 * self.max_rpm
+            self._rpm[channel] = target + (self._rpm[channel] - target) * decay
+
+
+class SimulatedRoboteqFactory:
+    """Callable that replaces serial.Serial, e.g.
+    patch("serial.Serial", side_effect=SimulatedRoboteqFactory(clock=clock)).
+    One device is kept per port, so a driver reopening a port gets the same
+    controller state back. baudrate and timeout given here override what
+    the driver asks for."""
+
+    SERIAL_SETTINGS = ("baudrate", "timeout")
+
+    def __init__(self, **options):
+        self.options = options
+        self.devices: Dict[Optional[str], SimulatedRoboteq] = {}
+
+    def __call__(self, port: Optional[str] = None, *args, **kwargs) -> SimulatedRoboteq:
+        device = self.devices.get(port)
+        if device is None:
+            simulation = {
+                key: value
+                for key, value in self.options.items()
+                if key not in self.SERIAL_SETTINGS
+            }
+            device = SimulatedRoboteq(port, *args, **{**kwargs, **simulation})
+            self.devices[port] = device
+        else:
+            device.open()
+        for key in self.SERIAL_SETTINGS:
+            if key in self.options:
+                setattr(device, key, self.options[key])
+        return device
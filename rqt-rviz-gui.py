@@ -1,20 +1,343 @@
 import os
+import threading
+import time
 import rospy
-from PyQt5.QtWidgets import QWidget, QPushButton
+from typing import Callable, List, Optional
+from nav_msgs.msg import Path
+from std_msgs.msg import Float32, Float32MultiArray, Int32
+from PyQt5.QtCore import QEvent, QPointF, Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QKeySequence, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import QLabel, QPushButton, QShortcut, QVBoxLayout, QWidget
 from python_qt_binding import loadUi
 from rqt_gui_py.plugin import Plugin
 from rviz import bindings as rviz
+from roboteq_faults import FAULT_FLAGS, FlagMonitor
+from telemetry_buffers import RingBuffer, decimateMinMax
 from unloading_robot_hardware_verification.srv import (
     trajectorySelect,
     trajectorySelectRequest,
     trajectorySelectResponse,
 )
 
+TRAJECTORY_SERVICE = "trajectory_select_service"
+
+# Trajectory topics, one per selection button.
+TRAJECTORY_TOPICS = ["traj_one", "traj_two", "traj_three", "traj_four"]
+# Latched topic the RViz display shows; the selected trajectory is relayed here.
+DISPLAY_TOPIC = "rqt_trajectory_display"
+
+# Button stylesheets for each state of a trajectory request.
+PENDING_STYLE = "background-color: #f0c040;"
+CANCELLING_STYLE = "background-color: #f0e0a0;"
+SUCCESS_STYLE = "background-color: #60c060;"
+FAILURE_STYLE = "background-color: #e06060;"
+
+# Workers still blocked in a service call when their plugin shut down. They
+# are kept referenced here so Qt never destroys a running thread.
+_LINGERING_WORKERS = []
+
+
+class TrajectoryRequestCancelled(rospy.ServiceException):
+    """Raised by TrajectoryServiceClient.call when its request is cancelled
+    before it is sent"""
+
+
+class TrajectoryServiceClient:
+    """Persistent connection to the trajectory select service. The service
+    is looked up once, and the connection is reopened in the background
+    when the server goes away."""
+
+    # How long a failed call waits for the reconnect before its one retry.
+    RETRY_TIMEOUT = 5.0
+
+    def __init__(self):
+        # _lock guards the connection state and is never held during a call,
+        # so close() and reconnect() never wait on a hung server.
+        self._lock = threading.Lock()
+        # Persistent proxies are not thread safe, so calls are serialized.
+        self._call_lock = threading.Lock()
+        self._connected = threading.Event()
+        self._proxy = None
+        self._reconnecting = False
+        self._closed = False
+        self.reconnect()
+
+    def reconnect(self) -> None:
+        with self._lock:
+            if self._reconnecting or self._closed:
+                return
+            self._reconnecting = True
+            self._connected.clear()
+            proxy, self._proxy = self._proxy, None
+        if proxy is not None:
+            proxy.close()
+        threading.Thread(target=self._connect, daemon=True).start()
+
+    def _connect(self) -> None:
+        try:
+            while not self._closed and not rospy.is_shutdown():
+                try:
+                    rospy.wait_for_service(TRAJECTORY_SERVICE, timeout=1.0)
+                except rospy.ROSInterruptException:
+                    return
+                except rospy.ROSException:
+                    continue
+                with self._lock:
+                    if self._closed:
+                        return
+                    self._proxy = rospy.ServiceProxy(
+                        TRAJECTORY_SERVICE, trajectorySelect, persistent=True
+                    )
+                    self._connected.set()
+                rospy.loginfo(f"Connected to {TRAJECTORY_SERVICE}")
+                return
+        finally:
+            with self._lock:
+                self._reconnecting = False
+
+    def wait_until_connected(self, timeout: float) -> bool:
+        return self._connected.wait(timeout)
+
+    def call(
+        self,
+        request: trajectorySelectRequest,
+        should_send: Callable[[], bool] = lambda: True,
+        retry: bool = True,
+    ) -> trajectorySelectResponse:
+        """Sends request, retrying once after a broken connection.
+        should_send is checked right before every send, including the retry,
+        so a request cancelled while it waits is never sent."""
+        with self._call_lock:
+            if not should_send():
+                raise TrajectoryRequestCancelled("request cancelled before sending")
+            with self._lock:
+                proxy = self._proxy
+            if proxy is None:
+                raise rospy.ServiceException(f"{TRAJECTORY_SERVICE} is not connected")
+            try:
+                return proxy(request)
+            except (rospy.ServiceException, rospy.exceptions.TransportException) as e:
+                error = e
+        # An error raised by the server's handler is a real answer; anything
+        # else means the connection broke, most likely a server restart.
+        if "responded with an error" in str(error):
+            raise error
+        self.reconnect()
+        if retry and not self._closed and self.wait_until_connected(self.RETRY_TIMEOUT):
+            return self.call(request, should_send, retry=False)
+        raise rospy.ServiceException(str(error))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._connected.clear()
+            proxy, self._proxy = self._proxy, None
+        # Closing the proxy also aborts a call blocked on it.
+        if proxy is not None:
+            proxy.close()
+
+
+class TrajectorySelectWorker(QThread):
+    """Calls the trajectory select service off the GUI thread"""
+
+    # Request id, success and message.
+    result = pyqtSignal(int, bool, str)
+
+    def __init__(
+        self,
+        client: TrajectoryServiceClient,
+        request_id: int,
+        desired_trajectory: str,
+        parent=None,
+    ):
+        super(TrajectorySelectWorker, self).__init__(parent)
+        self._client = client
+        self.request_id = request_id
+        self.desired_trajectory = desired_trajectory
+        self._state_lock = threading.Lock()
+        self._cancelled = False
+        self._sent = False
+
+    def cancel(self) -> bool:
+        """Stops the request if it has not been sent yet. Returns False if
+        it is already in flight; the server may still act on it, so its
+        result is still emitted."""
+        with self._state_lock:
+            self._cancelled = True
+            return not self._sent
+
+    def _start_sending(self) -> bool:
+        with self._state_lock:
+            if self._cancelled:
+                return False
+            self._sent = True
+            return True
+
+    def run(self) -> None:
+        while not self._cancelled:
+            if self._client.wait_until_connected(0.5):
+                break
+        if self._cancelled:
+            return
+        try:
+            request = trajectorySelectRequest(desiredTrajectory=self.desired_trajectory)
+            # Marks the request as sent only once it holds the connection, so
+            # one still queued behind another call can be cancelled outright.
+            response: trajectorySelectResponse = self._client.call(
+                request, self._start_sending
+            )
+            rospy.loginfo(
+                f"Service call success: {response.success}, message: {response.response}"
+            )
+            self.result.emit(self.request_id, response.success, response.response)
+        except TrajectoryRequestCancelled as e:
+            rospy.loginfo(f"Trajectory request not sent: {self.desired_trajectory}")
+            self.result.emit(self.request_id, False, str(e))
+        except Exception as e:
+            # Any failure has to reach the GUI, or the button stays pending.
+            rospy.logerr(f"Service call failed: {e}")
+            self.result.emit(self.request_id, False, str(e))
+
+
+class TelemetryPlot(QWidget):
+    """Line plot of the last window_seconds of one or more ring buffer
+    channels, drawn with QPainter"""
+
+    COLORS = [QColor("#1f77b4"), QColor("#d62728"), QColor("#2ca02c")]
+
+    def __init__(
+        self, title: str, buffer: RingBuffer, labels: List[str], window_seconds: float
+    ):
+        super(TelemetryPlot, self).__init__()
+        self.setMinimumHeight(120)
+        self._title = title
+        self._buffer = buffer
+        self._labels = labels
+        self._window_seconds = window_seconds
+
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("white"))
+        width, height = self.width(), self.height()
+        times, values = self._buffer.snapshot()
+        if len(times) > 0:
+            visible = times >= times[-1] - self._window_seconds
+            times, values = times[visible], values[visible]
+        if len(times) < 2:
+            painter.drawText(4, 14, f"{self._title}: no data")
+            return
+
+        series = [
+            decimateMinMax(times, values[:, channel], width)
+            for channel in range(values.shape[1])
+        ]
+        low = min(float(ys.min()) for _, ys in series)
+        high = max(float(ys.max()) for _, ys in series)
+        if high - low < 1e-6:
+            low, high = low - 1, high + 1
+        start = times[-1] - self._window_seconds
+
+        for channel, (xs, ys) in enumerate(series):
+            px = (xs - start) / self._window_seconds * (width - 1)
+            py = (high - ys) / (high - low) * (height - 20) + 18
+            painter.setPen(QPen(self.COLORS[channel % len(self.COLORS)], 1))
+            painter.drawPolyline(
+                QPolygonF([QPointF(x, y) for x, y in zip(px.tolist(), py.tolist())])
+            )
+
+        latest = "  ".join(
+            f"{label} {values[-1, channel]:.1f}"
+            for channel, label in enumerate(self._labels)
+        )
+        painter.setPen(QColor("black"))
+        painter.drawText(4, 14, f"{self._title}: {latest}  [{low:.1f}, {high:.1f}]")
+
+
+class TelemetryPanel(QWidget):
+    """Wheel speed, battery voltage and fault state from the HAL. Samples
+    are buffered as they arrive and the plots redraw on a throttled timer,
+    so fast topics never drive repaints of the GUI directly."""
+
+    def __init__(self):
+        super(TelemetryPanel, self).__init__()
+        window_seconds = rospy.get_param("~telemetry/window_seconds", 300.0)
+        # Room for the whole window at the fastest expected rate.
+        capacity = int(window_seconds * rospy.get_param("~telemetry/max_rate_hz", 200))
+        self._wheel_rpm = RingBuffer(capacity, 2)
+        self._voltage = RingBuffer(capacity)
+        self._fault_flags = 0
+        self._shown_faults = FlagMonitor(FAULT_FLAGS)
+
+        layout = QVBoxLayout(self)
+        self._fault_label = QLabel()
+        layout.addWidget(self._fault_label)
+        self._plots = [
+            TelemetryPlot(
+                "Wheel RPM", self._wheel_rpm, ["left", "right"], window_seconds
+            ),
+            TelemetryPlot("Battery V", self._voltage, ["battery"], window_seconds),
+        ]
+        for plot in self._plots:
+            layout.addWidget(plot)
+
+        self._subscribers = [
+            rospy.Subscriber(
+                rospy.get_param("~telemetry/wheel_rpm_topic", "mobile_base/wheel_rpm"),
+                Float32MultiArray,
+                self._on_wheel_rpm,
+                queue_size=10,
+            ),
+            rospy.Subscriber(
+                rospy.get_param(
+                    "~telemetry/voltage_topic", "mobile_base/battery_voltage"
+                ),
+                Float32,
+                self._on_voltage,
+                queue_size=10,
+            ),
+            rospy.Subscriber(
+                rospy.get_param("~telemetry/fault_topic", "mobile_base/fault_flags"),
+                Int32,
+                self._on_fault_flags,
+                queue_size=10,
+            ),
+        ]
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._refresh)
+        self._timer.start(int(1000 / rospy.get_param("~telemetry/refresh_hz", 10)))
+
+    def _on_wheel_rpm(self, message: Float32MultiArray) -> None:
+        if len(message.data) >= 2:
+            self._wheel_rpm.append(time.monotonic(), message.data[:2])
+
+    def _on_voltage(self, message: Float32) -> None:
+        self._voltage.append(time.monotonic(), message.data)
+
+    def _on_fault_flags(self, message: Int32) -> None:
+        self._fault_flags = message.data
+
+    def _refresh(self) -> None:
+        faults = self._shown_faults.update(self._fault_flags)
+        if faults is not None:
+            self._fault_label.setText(f"Faults: {faults.message or 'none'}")
+            self._fault_label.setStyleSheet(FAILURE_STYLE if faults.value else "")
+        if self.isVisible():
+            for plot in self._plots:
+                plot.update()
+
+    def shutdown(self) -> None:
+        self._timer.stop()
+        for subscriber in self._subscribers:
+            subscriber.unregister()
+
 
 class GuiPlugin(Plugin):
 
     def __init__(self, context):
         super(GuiPlugin, self).__init__(context)
+        self._start_time = time.monotonic()
+        self.startup_times = {}
         # Give QObjects names
         self.setObjectName("GuiPlugin")
         # Create QWidget
@@ -26,11 +349,17 @@ class GuiPlugin(Plugin):
         # Extend widget with all attributes and children from UI file
         loadUi(ui_file, self._widget)
 
-        self._rviz_frame = rviz.VisualizationFrame()
-        self._rviz_frame.setSplashPath("")
-        self._rviz_frame.initialize()
+        # RViz is slow to build, so a placeholder holds its place until the
+        # panel has been painted once.
+        self._rviz_frame = None
+        self._rviz_placeholder = QLabel("Loading RViz...")
+        self._rviz_placeholder.setAlignment(Qt.AlignCenter)
+        self._widget.layout().addWidget(self._rviz_placeholder)
+        self._widget.installEventFilter(self)
+        self._shutting_down = False
 
-        self._widget.layout().addWidget(self._rviz_frame)
+        self._telemetry_panel = TelemetryPanel()
+        self._widget.layout().addWidget(self._telemetry_panel)
 
         # Add widget to the user interface
         if context.serial_number() > 1:
@@ -40,50 +369,247 @@ class GuiPlugin(Plugin):
 
         context.add_widget(self._widget)
 
-        self._manager = self._rviz_frame.getManager()
+        # Subscribe to every trajectory up front and cache its latest path,
+        # so switching only republishes a cached path to the display.
+        self.trajectory_topics = list(TRAJECTORY_TOPICS)
+        # Nothing is relayed to the display until a selection succeeds.
+        self.current_topic: Optional[str] = None
+        self._latest_paths = {}
+        # Callbacks and the GUI thread both publish to the display topic.
+        self._display_lock = threading.Lock()
+        self._display_publisher = rospy.Publisher(
+            DISPLAY_TOPIC, Path, queue_size=1, latch=True
+        )
+        self._trajectory_subscribers = [
+            rospy.Subscriber(
+                topic, Path, self._on_trajectory, callback_args=topic, queue_size=1
+            )
+            for topic in self.trajectory_topics
+        ]
 
-        self._trajectory_display = self._manager.createDisplay(
-            "rviz/Path", "Trajectory Display", True
+        self._buttons = {}
+        self._button_labels = {}
+        for button_name, trajectory in (
+            ("button_one", "traj_one"),
+            ("button_two", "traj_two"),
+            ("button_three", "traj_three"),
+            ("button_four", "traj_four"),
+        ):
+            button = self._widget.findChild(QPushButton, button_name)
+            button.clicked.connect(
+                lambda action, trajectory=trajectory: self.on_button_press(
+                    action, trajectory
+                )
+            )
+            self._buttons[trajectory] = button
+            self._button_labels[trajectory] = button.text()
+        # Selects the next trajectory, as if its button had been pressed.
+        self._cycle_shortcut = QShortcut(
+            QKeySequence("Ctrl+Right"), self._widget, self.cycle_trajectories
         )
+        self._cycle_shortcut.setContext(Qt.WidgetWithChildrenShortcut)
+
+        self._trajectory_client = TrajectoryServiceClient()
+
+        # Only the latest request owns the buttons. A request cancelled after
+        # it was sent is kept until its result arrives, since the server may
+        # still have switched trajectory.
+        self._request_id = 0
+        self._pending_worker = None
+        self._cancelling_workers = {}
+        self._workers = set()
+
+    def eventFilter(self, watched, event) -> bool:
+        if watched is self._widget and event.type() == QEvent.Paint:
+            self._widget.removeEventFilter(self)
+            self._record_startup_time("panel")
+            # Let the first paint finish before blocking on RViz.
+            QTimer.singleShot(0, self._initialize_rviz)
+        return False
+
+    def _initialize_rviz(self) -> None:
+        if self._shutting_down:
+            return
+        self._rviz_frame = rviz.VisualizationFrame()
+        self._rviz_frame.setSplashPath("")
+        self._rviz_frame.initialize()
 
-        button_one = self._widget.findChild(QPushButton, "button_one")
-        button_one.clicked.connect(
-            lambda action: self.on_button_press(action, "traj_one")
+        config_file = rospy.get_param(
+            "~rviz_config",
+            os.path.join(
+                os.path.dirname(os.path.realpath(__file__)),
+                "resource/trajectory_display.rviz",
+            ),
         )
+        if os.path.isfile(config_file):
+            config = rviz.Config()
+            rviz.YamlConfigReader().readFile(config, config_file)
+            self._rviz_frame.load(config)
+        else:
+            rospy.logwarn(f"RViz config {config_file} not found, using defaults")
+
+        self._manager = self._rviz_frame.getManager()
+        self._trajectory_display = self._find_display("Trajectory Display")
+        if self._trajectory_display is None:
+            self._trajectory_display = self._manager.createDisplay(
+                "rviz/Path", "Trajectory Display", True
+            )
+        # The relay topic is owned by this plugin, whatever the config says.
+        self._trajectory_display.subProp("Topic").setValue(DISPLAY_TOPIC)
+
+        self._widget.layout().replaceWidget(self._rviz_placeholder, self._rviz_frame)
+        self._rviz_placeholder.deleteLater()
+        self._record_startup_time("rviz")
+
+    def _find_display(self, name: str):
+        displays = self._manager.getRootDisplayGroup()
+        for index in range(displays.numDisplays()):
+            display = displays.getDisplayAt(index)
+            if display.getName() == name:
+                return display
+        return None
 
-        button_two = self._widget.findChild(QPushButton, "button_two")
-        button_two.clicked.connect(
-            lambda action: self.on_button_press(action, "traj_two")
+    def _record_startup_time(self, stage: str) -> None:
+        self.startup_times[stage] = time.monotonic() - self._start_time
+        rospy.loginfo(
+            f"GuiPlugin startup: {stage} ready after {self.startup_times[stage]:.3f} s"
         )
 
-        button_three = self._widget.findChild(QPushButton, "button_three")
-        button_three.clicked.connect(
-            lambda action: self.on_button_press(action, "traj_three")
+    def on_button_press(self, action: bool, desired_trajectory: str) -> None:
+        pending = self._pending_worker
+        if pending is not None:
+            self.cancel_request()
+            # Pressing the pending button again only cancels it.
+            if pending.desired_trajectory == desired_trajectory:
+                return
+
+        self._request_id += 1
+        # Parented to the plugin so dropping the Python reference never
+        # destroys a running thread; Qt deletes it once it has exited.
+        worker = TrajectorySelectWorker(
+            self._trajectory_client, self._request_id, desired_trajectory, self
         )
+        worker.result.connect(self._on_request_result)
+        worker.finished.connect(lambda worker=worker: self._workers.discard(worker))
+        worker.finished.connect(worker.deleteLater)
+        self._workers.add(worker)
+        self._pending_worker = worker
+        self._set_button_state(desired_trajectory, PENDING_STYLE, "pending")
+        worker.start()
 
-        button_four = self._widget.findChild(QPushButton, "button_four")
-        button_four.clicked.connect(
-            lambda action: self.on_button_press(action, "traj_four")
+    def cancel_request(self) -> None:
+        worker = self._pending_worker
+        if worker is None:
+            return
+        self._pending_worker = None
+        if worker.cancel():
+            self._set_button_state(worker.desired_trajectory, "", None)
+            rospy.loginfo(f"Trajectory request cancelled: {worker.desired_trajectory}")
+            return
+        self._cancelling_workers[worker.request_id] = worker
+        self._set_button_state(
+            worker.desired_trajectory, CANCELLING_STYLE, "cancelling\u2026"
+        )
+        rospy.loginfo(
+            f"Trajectory request already sent, waiting for its result: "
+            f"{worker.desired_trajectory}"
         )
 
-    def on_button_press(self, action: bool, desired_trajectory: str) -> None:
-        rospy.wait_for_service("trajectory_select_service")
-        try:
-            trajectory_service = rospy.ServiceProxy(
-                "trajectory_select_service", trajectorySelect
-            )
-            request = trajectorySelectRequest(desiredTrajectory=desired_trajectory)
-            response: trajectorySelectResponse = trajectory_service(request)
-            rospy.loginfo(
-                f"Service call success: {response.success}, message: {response.response}"
-            )
-        except rospy.ServiceException as e:
-            rospy.logerr(f"Service call failed: {e}")
+    def _on_request_result(self, request_id: int, success: bool, message: str) -> None:
+        cancelled = self._cancelling_workers.pop(request_id, None)
+        if cancelled is not None:
+            self._on_cancelled_result(cancelled, success, message)
+            return
+        worker = self._pending_worker
+        if worker is None or worker.request_id != request_id:
+            return
+        self._pending_worker = None
+        if success:
+            # Only a trajectory the server accepted is shown.
+            if worker.desired_trajectory in self.trajectory_topics:
+                self.show_trajectory(worker.desired_trajectory)
+            self._set_button_state(worker.desired_trajectory, SUCCESS_STYLE, None)
+        else:
+            self._set_button_state(worker.desired_trajectory, FAILURE_STYLE, "failed")
+            self._buttons[worker.desired_trajectory].setToolTip(message)
+
+    def _on_cancelled_result(
+        self, worker: TrajectorySelectWorker, success: bool, message: str
+    ) -> None:
+        # The server switched even though the operator cancelled, so the
+        # display has to follow it.
+        if success and worker.desired_trajectory in self.trajectory_topics:
+            self.show_trajectory(worker.desired_trajectory)
+        # A newer request owns the buttons until it finishes.
+        if self._pending_worker is not None:
+            return
+        if success:
+            self._set_button_state(worker.desired_trajectory, SUCCESS_STYLE, None)
+        else:
+            self._set_button_state(worker.desired_trajectory, "", None)
+            self._buttons[worker.desired_trajectory].setToolTip(message)
+
+    def _set_button_state(
+        self, trajectory: str, style: str, status: Optional[str]
+    ) -> None:
+        # Clear the state left on every other button by earlier requests.
+        for name, button in self._buttons.items():
+            button.setStyleSheet("")
+            button.setText(self._button_labels[name])
+            button.setToolTip("")
+        label = self._button_labels[trajectory]
+        button = self._buttons[trajectory]
+        button.setStyleSheet(style)
+        button.setText(f"{label} ({status})" if status else label)
+
+    def _on_trajectory(self, path: Path, topic: str) -> None:
+        with self._display_lock:
+            self._latest_paths[topic] = path
+            if topic == self.current_topic:
+                self._display_publisher.publish(path)
+
+    def show_trajectory(self, topic: str) -> None:
+        # Read before taking the lock; it may query RViz.
+        fixed_frame = self._fixed_frame()
+        with self._display_lock:
+            self.current_topic = topic
+            path = self._latest_paths.get(topic)
+            if path is None:
+                # Nothing received yet; clear the display instead of showing
+                # the previous trajectory.
+                path = Path()
+                path.header.frame_id = fixed_frame
+            self._display_publisher.publish(path)
+
+    def _fixed_frame(self) -> str:
+        if self._rviz_frame is not None:
+            return str(self._manager.getFixedFrame())
+        return rospy.get_param("~fixed_frame", "map")
 
     def cycle_trajectories(self) -> None:
-        self.current_index = (self.current_index + 1) % len(self.trajectory_topics)
-        next_topic = self.trajectory_topics[self.current_index]
-        self._trajectory_display_subprop.setValue(next_topic)
+        # Goes through the service like a button press, so the display only
+        # changes once the server has switched.
+        next_index = 0
+        if self.current_topic is not None:
+            index = self.trajectory_topics.index(self.current_topic)
+            next_index = (index + 1) % len(self.trajectory_topics)
+        self.on_button_press(False, self.trajectory_topics[next_index])
 
     def shutdown_plugin(self) -> None:
-        pass
+        self._shutting_down = True
+        self._telemetry_panel.shutdown()
+        for subscriber in self._trajectory_subscribers:
+            subscriber.unregister()
+        self._display_publisher.unregister()
+        self.cancel_request()
+        for worker in list(self._workers):
+            worker.cancel()
+        # Closing the client first aborts calls in flight, so the waits
+        # below are short instead of up to a second per worker.
+        self._trajectory_client.close()
+        for worker in list(self._workers):
+            # A worker stuck in a service call is not waited for forever, but
+            # it must outlive the plugin rather than be destroyed running.
+            if not worker.wait(1000):
+                worker.setParent(None)
+                _LINGERING_WORKERS.append(worker)
@@ -0,0 +1,98 @@
+# External modules.
+import time
+import unittest
+from unittest.mock import MagicMock, call
+
+# Internal modules.
+from setpoint_coalescer import CoalescedMobileBase, CoalescedRoboteq
+
+
+# Class to test speed setpoint coalescing.
+class test_setpoint_coalescer(unittest.TestCase):
+
+    def setUp(self):
+        # Mock controller and a manually advanced clock.
+        self.controller = MagicMock()
+        self.now = 0.0
+        self.coalescer = CoalescedRoboteq(
+            self.controller, deadband=5, keepalive=0.5, clock=lambda: self.now
+        )
+
+    def test_duplicates(self):
+        """Checks a repeated setpoint is only sent once"""
+        self.assertTrue(self.coalescer.setSpeed(100, 1))
+        for _ in range(10):
+            self.assertFalse(self.coalescer.setSpeed(100, 1))
+        self.controller.setSpeed.assert_called_once_with(100, 1)
+        self.assertEqual(self.coalescer.sent_count, 1)
+        self.assertEqual(self.coalescer.skipped_count, 10)
+
+    def test_channels(self):
+        """Checks each channel remembers its own setpoint"""
+        self.coalescer.setSpeed(100, 1)
+        self.assertTrue(self.coalescer.setSpeed(100, 2))
+        self.assertEqual(
+            self.controller.setSpeed.call_args_list, [call(100, 1), call(100, 2)]
+        )
+
+    def test_deadband(self):
+        """Checks changes within the deadband are skipped, stops are not"""
+        self.coalescer.setSpeed(100, 1)
+        self.assertFalse(self.coalescer.setSpeed(104, 1))
+        self.assertTrue(self.coalescer.setSpeed(106, 1))
+        self.coalescer.setSpeed(3, 1)
+        self.assertTrue(self.coalescer.setSpeed(0, 1))
+        self.controller.setSpeed.assert_called_with(0, 1)
+
+    def test_keepalive(self):
+        """Checks the setpoint is resent before the watchdog runs out"""
+        self.coalescer.setSpeed(100, 1)
+        self.now = 0.4
+        self.assertFalse(self.coalescer.setSpeed(103, 1))
+        self.assertEqual(self.coalescer.flush(), [])
+        self.now = 0.5
+        # The latest target is what gets resent.
+        self.assertEqual(self.coalescer.flush(), [1])
+        self.controller.setSpeed.assert_called_with(103, 1)
+
+    def test_forget(self):
+        """Checks forget() makes the next setpoint go out"""
+        self.coalescer.setSpeed(100, 1)
+        self.coalescer.forget()
+        self.assertTrue(self.coalescer.setSpeed(100, 1))
+
+    def test_failedSend(self):
+        """Checks a setpoint that failed to send is retried"""
+        self.controller.setSpeed.side_effect = [IOError("port closed"), None]
+        with self.assertRaises(IOError):
+            self.coalescer.setSpeed(100, 1)
+        self.assertEqual(self.coalescer.flush(), [1])
+
+    def test_mobileBase(self):
+        """Checks left and right speeds are coalesced together"""
+        base = MagicMock()
+        coalescer = CoalescedMobileBase(base, clock=lambda: self.now)
+        self.assertTrue(coalescer.setSpeed(100, -100))
+        self.assertFalse(coalescer.setSpeed(100, -100))
+        self.assertTrue(coalescer.setSpeed(100, -90))
+        self.assertEqual(
+            base.setSpeed.call_args_list, [call(100, -100), call(100, -90)]
+        )
+
+    def test_background(self):
+        """Checks a burst of updates is merged into the latest value"""
+        coalescer = CoalescedRoboteq(self.controller, rate_hz=20)
+        coalescer.start()
+        for speed in range(1, 101):
+            coalescer.setSpeed(speed, 1)
+        deadline = time.monotonic() + 2
+        while not self.controller.setSpeed.called:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertTrue(coalescer.stop(timeout=1))
+        self.controller.setSpeed.assert_called_with(100, 1)
+        self.assertLess(self.controller.setSpeed.call_count, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
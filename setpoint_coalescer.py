@@ -0,0 +1,170 @@
+# External modules.
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+Setpoint = Tuple[int, ...]
+
+
+class SetpointCoalescer:
+    """Skips speed setpoints that would not change what the controller is
+    doing. Remembers the last setpoint sent on each channel and only sends
+    a new one when it differs by more than deadband, or when keepalive
+    seconds have passed, so the controller's watchdog never times out.
+    Moving to zero is always sent.
+
+    Without start(), every setSpeed call is sent or skipped on the spot.
+    After start(), setSpeed only records the target and a thread sends the
+    latest target per channel at rate_hz, so a burst of updates between
+    two bus slots costs one command.
+
+    Commands sent to the device without going through the coalescer
+    (stop, estop, reset) make its record stale; call forget() after them
+    so the next setpoint is always sent."""
+
+    def __init__(
+        self,
+        device,
+        deadband: int = 0,
+        keepalive: Optional[float] = 0.5,
+        rate_hz: float = 50.0,
+        lock=None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.device = device
+        self.deadband = deadband
+        self.keepalive = keepalive
+        self.period = 1.0 / rate_hz
+        # Shared port lock, e.g. TelemetryPoller.lock or CommandScheduler.lock.
+        self.lock = lock if lock is not None else threading.Lock()
+        self._clock = clock
+        self._state_lock = threading.Lock()
+        self._targets: Dict[Hashable, Setpoint] = {}
+        self._changed: Set[Hashable] = set()
+        self._sent: Dict[Hashable, Tuple[Setpoint, float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sent_count = 0
+        self.skipped_count = 0
+        self.last_error: Optional[Exception] = None
+
+    def submit(self, key: Hashable, value: Setpoint) -> bool:
+        """Records the target for one channel. Returns whether it was sent,
+        which is always False while the sender thread is running."""
+        with self._state_lock:
+            self._targets[key] = value
+            self._changed.add(key)
+        if self._thread is not None and not self._stop.is_set():
+            return False
+        return key in self.flush()
+
+    def flush(self) -> List[Hashable]:
+        """Sends every target that needs sending; returns their keys"""
+        now = self._clock()
+        with self._state_lock:
+            targets = dict(self._targets)
+            changed, self._changed = self._changed, set()
+            sent = dict(self._sent)
+        keys = []
+        for key, value in targets.items():
+            if self._needsSend(value, sent.get(key), now, key in changed):
+                try:
+                    self._transmit(key, value)
+                except Exception:
+                    # Retried on the next flush.
+                    with self._state_lock:
+                        self._changed.add(key)
+                    raise
+                keys.append(key)
+            elif key in changed:
+                self.skipped_count += 1
+        return keys
+
+    def forget(self) -> None:
+        """Drops the record of what was sent, so every target is resent"""
+        with self._state_lock:
+            self._sent.clear()
+
+    def start(self) -> None:
+        running = self._thread is not None and self._thread.is_alive()
+        if running and not self._stop.is_set():
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Stops the sender thread after it sends any target still pending.
+        Returns False if the thread was still sending when timeout ran out."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+            self._thread = None
+        return True
+
+    def _needsSend(
+        self,
+        value: Setpoint,
+        sent: Optional[Tuple[Setpoint, float]],
+        now: float,
+        changed: bool,
+    ) -> bool:
+        if sent is None:
+            return True
+        last, stamp = sent
+        if self.keepalive is not None and now - stamp >= self.keepalive:
+            return True
+        if not changed or value == last:
+            return False
+        # A stop inside the deadband must still reach the motors.
+        if not any(value):
+            return True
+        return any(abs(new - old) > self.deadband for new, old in zip(value, last))
+
+    def _transmit(self, key: Hashable, value: Setpoint) -> None:
+        with self.lock:
+            self._send(key, value)
+        with self._state_lock:
+            self._sent[key] = (value, self._clock())
+        self.sent_count += 1
+
+    def _send(self, key: Hashable, value: Setpoint) -> None:
+        raise NotImplementedError
+
+    def _run(self, stop: threading.Event) -> None:
+        while True:
+            # One last flush after stop() so the final target is not lost.
+            stopping = stop.wait(self.period)
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = e
+            if stopping:
+                return
+
+
+class CoalescedRoboteq(SetpointCoalescer):
+    """SetpointCoalescer in front of Roboteq.setSpeed, one setpoint per
+    channel"""
+
+    def setSpeed(self, speed: int, channel: int) -> bool:
+        return self.submit(channel, (speed,))
+
+    def _send(self, key: Hashable, value: Setpoint) -> None:
+        self.device.setSpeed(value[0], key)
+
+
+class CoalescedMobileBase(SetpointCoalescer):
+    """SetpointCoalescer in front of MobileBase.setSpeed, with the left
+    and right speeds as one setpoint"""
+
+    def setSpeed(self, left: int, right: int) -> bool:
+        return self.submit("base", (left, right))
+
+    def _send(self, key: Hashable, value: Setpoint) -> None:
+        self.device.setSpeed(*value)
@@ -0,0 +1,112 @@
+# External modules.
+import threading
+import unittest
+
+import numpy as np
+
+# Internal modules.
+from telemetry_buffers import RingBuffer, decimateMinMax
+
+
+# Class to test the telemetry ring buffer.
+class test_ring_buffer(unittest.TestCase):
+
+    def test_empty(self):
+        """Checks an empty buffer returns no samples"""
+        times, values = RingBuffer(4, 2).snapshot()
+        self.assertEqual(times.shape, (0,))
+        self.assertEqual(values.shape, (0, 2))
+
+    def test_partial(self):
+        """Checks samples come back in order before the buffer fills"""
+        buffer = RingBuffer(4, 2)
+        buffer.append(1.0, [10, -10])
+        buffer.append(2.0, [20, -20])
+        times, values = buffer.snapshot()
+        np.testing.assert_array_equal(times, [1, 2])
+        np.testing.assert_array_equal(values, [[10, -10], [20, -20]])
+
+    def test_wraparound(self):
+        """Checks the oldest samples are overwritten and order is kept"""
+        buffer = RingBuffer(4)
+        for stamp in range(10):
+            buffer.append(stamp, stamp * 10)
+        times, values = buffer.snapshot()
+        np.testing.assert_array_equal(times, [6, 7, 8, 9])
+        np.testing.assert_array_equal(values[:, 0], [60, 70, 80, 90])
+        # Exactly full after a whole number of laps.
+        for stamp in range(10, 12):
+            buffer.append(stamp, stamp * 10)
+        times, _ = buffer.snapshot()
+        np.testing.assert_array_equal(times, [8, 9, 10, 11])
+
+    def test_snapshotCopies(self):
+        """Checks a snapshot is not changed by later appends"""
+        buffer = RingBuffer(2)
+        buffer.append(1.0, 1)
+        times, _ = buffer.snapshot()
+        buffer.append(2.0, 2)
+        buffer.append(3.0, 3)
+        times_full, _ = buffer.snapshot()
+        buffer.append(4.0, 4)
+        np.testing.assert_array_equal(times, [1])
+        np.testing.assert_array_equal(times_full, [2, 3])
+
+    def test_concurrentAppend(self):
+        """Checks appends from several threads are all counted"""
+        buffer = RingBuffer(4000)
+        threads = [
+            threading.Thread(
+                target=lambda: [buffer.append(1.0, 1) for _ in range(1000)]
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(buffer.snapshot()[0]), 4000)
+
+
+# Class to test min/max decimation.
+class test_decimate_min_max(unittest.TestCase):
+
+    def test_short(self):
+        """Checks short series are returned unchanged"""
+        times = np.arange(10.0)
+        values = np.arange(10.0)
+        result_times, result_values = decimateMinMax(times, values, 5)
+        self.assertIs(result_times, times)
+        self.assertIs(result_values, values)
+
+    def test_binning(self):
+        """Checks each bin becomes its min and max at the bin start time"""
+        times = np.arange(12.0)
+        values = np.array([3, 1, 2, 9, 5, 4, 0, 7, 6, 8, 2, 2], dtype=float)
+        result_times, result_values = decimateMinMax(times, values, 4)
+        np.testing.assert_array_equal(result_times, [0, 0, 3, 3, 6, 6, 9, 9])
+        np.testing.assert_array_equal(result_values, [1, 3, 4, 9, 0, 7, 2, 8])
+
+    def test_remainder(self):
+        """Checks leftover samples are dropped from the oldest end"""
+        times = np.arange(11.0)
+        values = np.arange(11.0)
+        result_times, result_values = decimateMinMax(times, values, 5)
+        # 11 samples in 5 bins of 2; sample 0 is dropped.
+        np.testing.assert_array_equal(result_times[0::2], [1, 3, 5, 7, 9])
+        np.testing.assert_array_equal(result_values[1::2], [2, 4, 6, 8, 10])
+
+    def test_spike(self):
+        """Checks a single spike survives heavy decimation"""
+        times = np.arange(100000.0)
+        values = np.zeros(100000)
+        values[54321] = 5
+        values[12345] = -3
+        result_times, result_values = decimateMinMax(times, values, 100)
+        self.assertEqual(len(result_values), 200)
+        self.assertEqual(result_values.max(), 5)
+        self.assertEqual(result_values.min(), -3)
+
+
+if __name__ == "__main__":
+    unittest.main()
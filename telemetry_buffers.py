@@ -0,0 +1,52 @@
+# External modules.
+import threading
+from typing import Tuple
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size buffer of timestamped samples, written from ROS callbacks
+    and read by the GUI thread"""
+
+    def __init__(self, capacity: int, channels: int = 1):
+        self._times = np.zeros(capacity)
+        self._values = np.zeros((capacity, channels))
+        self._lock = threading.Lock()
+        self._next = 0
+        self._count = 0
+
+    def append(self, stamp: float, values) -> None:
+        with self._lock:
+            self._times[self._next] = stamp
+            self._values[self._next] = values
+            self._next = (self._next + 1) % len(self._times)
+            self._count = min(self._count + 1, len(self._times))
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of the samples, oldest first"""
+        with self._lock:
+            if self._count < len(self._times):
+                return (
+                    self._times[: self._count].copy(),
+                    self._values[: self._count].copy(),
+                )
+            order = np.roll(np.arange(len(self._times)), -self._next)
+            return self._times[order], self._values[order]
+
+
+def decimateMinMax(
+    times: np.ndarray, values: np.ndarray, bins: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduces a series to the min and max of each bin, keeping its envelope
+    so spikes stay visible however many samples there are"""
+    if len(times) <= 2 * bins:
+        return times, values
+    size = len(times) // bins
+    usable = size * bins
+    shaped = values[len(values) - usable :].reshape(bins, size)
+    bin_times = times[len(times) - usable :].reshape(bins, size)[:, 0]
+    decimated = np.empty(2 * bins)
+    decimated[0::2] = shaped.min(axis=1)
+    decimated[1::2] = shaped.max(axis=1)
+    return np.repeat(bin_times, 2), decimated